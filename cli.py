@@ -9,6 +9,7 @@ from datetime import datetime
 from typing import Optional
 import json
 import csv
+import traceback
 
 from rich.console import Console
 from rich.prompt import Prompt, Confirm
@@ -32,6 +33,7 @@ Examples:
   uv run cli.py solve P68688_en                    # Solve Hello World problem
   uv run cli.py solve P68688_en --compiler G++17   # Use C++ compiler
   uv run cli.py solve --batch problems.txt         # Solve multiple problems
+  uv run cli.py solve --batch problems.txt --batch-api  # Generate them at half price via the OpenAI Batch API
   uv run cli.py config                             # Setup configuration
   uv run cli.py benchmark hello_world              # Benchmark AI models on hello_world problem set
   uv run cli.py benchmark basic_algorithms --models GPT-4o-mini GPT-4o  # Benchmark specific models
@@ -48,6 +50,9 @@ Examples:
     solve_parser.add_argument('--compiler', '-c', help='Compiler to use (Python3, G++17, JDK)')
     solve_parser.add_argument('--batch', '-b', help='File containing list of problem IDs')
     solve_parser.add_argument('--config', help='Config file path')
+    solve_parser.add_argument('--workers', '-w', type=int, default=None, help='Problems solved concurrently in batch mode')
+    solve_parser.add_argument('--batch-api', action='store_true', help='Generate batch solutions with the OpenAI Batch API (half price, results within 24h)')
+    solve_parser.add_argument('--no-cache', action='store_true', help='Ignore the response and verdict caches for this run')
     
     # Config command
     config_parser = subparsers.add_parser('config', help='Setup configuration')
@@ -88,12 +93,16 @@ def handle_solve_command(args):
         console.print("[red]Configuration validation failed. Run 'python cli.py config' to setup.[/red]")
         return
     
+    if args.no_cache:
+        config.openai.response_cache_path = None
+        config.jutge.verdict_cache_path = None
+    
     # Initialize solver
     solver = JutgeProblemSolver(config)
     
     if args.batch:
         # Batch processing
-        solve_batch(solver, args.batch, args.compiler)
+        solve_batch(solver, args.batch, args.compiler, args.workers, args.batch_api)
     elif args.problem_id:
         # Single problem
         solve_single(solver, args.problem_id, args.compiler)
@@ -219,7 +228,6 @@ def handle_benchmark_command(args):
         
     except Exception as e:
         console.print(f"[red]✗ Benchmark failed: {e}[/red]")
-        import traceback
         traceback.print_exc()
 
 
@@ -1143,7 +1151,8 @@ def solve_single(solver: JutgeProblemSolver, problem_id: str, compiler_id: Optio
         console.print(f"[red]✗ Failed to solve problem: {result.get('error', 'Unknown error')}[/red]")
 
 
-def solve_batch(solver: JutgeProblemSolver, batch_file: str, compiler_id: Optional[str]):
+def solve_batch(solver: JutgeProblemSolver, batch_file: str, compiler_id: Optional[str],
+                max_workers: Optional[int] = None, use_batch_api: bool = False):
     """Solve multiple problems from a file"""
     try:
         with open(batch_file, 'r') as f:
@@ -1151,17 +1160,10 @@ def solve_batch(solver: JutgeProblemSolver, batch_file: str, compiler_id: Option
         
         console.print(f"[blue]Processing {len(problem_ids)} problems from {batch_file}[/blue]")
         
-        results = []
-        for i, problem_id in enumerate(problem_ids, 1):
-            console.print(f"\\n[bold]Problem {i}/{len(problem_ids)}: {problem_id}[/bold]")
-            
-            result = solver.solve_problem(problem_id, compiler_id)
-            results.append(result)
-            
-            # Brief pause between problems
-            if i < len(problem_ids):
-                import time
-                time.sleep(2)
+        if use_batch_api:
+            results = solver.solve_problems_batch(problem_ids, compiler_id, max_workers=max_workers)
+        else:
+            results = solver.solve_problems(problem_ids, compiler_id, max_workers=max_workers)
         
         # Summary
         console.print("\\n" + "="*60)
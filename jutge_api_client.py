@@ -1469,6 +1469,8 @@ class JutgeApiClient:
     testing: ModuleTesting
 
     def __init__(self):
+        # One session for every request, so consecutive calls reuse the connection instead of a new TLS handshake
+        self._session = requests.Session()
         self.auth = ModuleAuth(self)
         self.misc = ModuleMisc(self)
         self.tables = ModuleTables(self)
@@ -1486,7 +1488,7 @@ class JutgeApiClient:
         if ifiles is not None:
             for i, ifile in enumerate(ifiles):
                 files["file_" + str(i)] = ifile
-        response = requests.post(self.JUTGE_API_URL, data={"data": json.dumps(data)}, files=files)
+        response = self._session.post(self.JUTGE_API_URL, data={"data": json.dumps(data)}, files=files)
         content_type = response.headers.get("content-type", "").split(";")[0].lower()
         if content_type != "multipart/form-data":
             raise ProtocolException("The content type is not multipart/form-data")
@@ -34,6 +34,10 @@ from jutge_solver import Config
 from jutge_solver.benchmark_config import BenchmarkConfig, AIModelConfig
 from jutge_solver.problem_analyzer import ProblemAnalyzer
 from jutge_solver.solution_generator import SolutionGenerator
+from jutge_solver.verdict_manager import VerdictManager
+
+# System prompt sent to every model under benchmark
+BENCHMARK_SYSTEM_PROMPT = "You are an expert competitive programmer. Generate only the code solution without any explanation."
 
 
 class BenchmarkResult:
@@ -113,12 +117,14 @@ class AIModelAdapter:
             response = self.client.chat.completions.create(
                 model=self.config.model_id,
                 messages=[
-                    {"role": "system", "content": "You are an expert competitive programmer. Generate only the code solution without any explanation."},
+                    {"role": "system", "content": BENCHMARK_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=self.config.max_tokens,
                 temperature=self.config.temperature,
-                timeout=self.config.timeout
+                timeout=self.config.timeout,
+                **self.solution_generator._prompt_cache_options(self.config.model_id, "benchmark", language,
+                                                                BENCHMARK_SYSTEM_PROMPT)
             )
             raw_solution = response.choices[0].message.content
             tokens = response.usage.total_tokens
@@ -129,7 +135,7 @@ class AIModelAdapter:
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=self.config.max_tokens,
                 temperature=self.config.temperature,
-                system="You are an expert competitive programmer. Generate only the code solution without any explanation."
+                system=BENCHMARK_SYSTEM_PROMPT
             )
             raw_solution = response.content[0].text
             tokens = response.usage.input_tokens + response.usage.output_tokens
@@ -160,12 +166,13 @@ class AIModelAdapter:
     def _create_prompt(self, problem_data: Dict[str, Any], language: str) -> str:
         """Create prompt for the AI model"""
         if language == "G++17":
-            # C++ specific prompt
+            # C++ specific prompt; static instructions come first so the prefix is shared across problems (prompt caching)
             return f"""Please solve the following competitive programming problem in C++.
 Your solution should be a single, complete, and runnable C++ program.
 It must include all necessary headers, such as `<iostream>`, and be wrapped in a `main` function.
 Do not use any external libraries or platform-specific features.
 Focus on correctness and efficiency.
+Your final output should be only the C++ code, with no additional explanations or markdown.
 
 **Problem Details:**
 
@@ -182,12 +189,11 @@ Focus on correctness and efficiency.
 
 **Sample Inputs and Outputs:**
 {self._format_samples(problem_data.get('samples', []))}
-
-Your final output should be only the C++ code, with no additional explanations or markdown.
 """
         else:
             # Default prompt for other languages
-            return f"""Solve this programming problem in {language}:
+            return f"""Solve this programming problem in {language}.
+Generate only the code solution without any explanation or markdown formatting.
 
 Title: {problem_data.get('title', 'Unknown')}
 
@@ -202,8 +208,6 @@ Output:
 
 Sample Inputs and Outputs:
 {self._format_samples(problem_data.get('samples', []))}
-
-Generate only the code solution without any explanation or markdown formatting.
 """
     
     def _format_samples(self, samples: List[Dict[str, str]]) -> str:
@@ -241,6 +245,8 @@ def benchmark_single_problem(model_config: AIModelConfig, problem_id: str, jutge
             self.max_tokens = model_config.max_tokens
             self.temperature = model_config.temperature
             self.timeout = model_config.timeout
+            # Benchmarks measure the model, so trivial problems are never answered from a template
+            self.trivial_templates = False
     
     solution_generator = SolutionGenerator(openai_client, MockOpenAIConfig(model_config), raw_logging_config or {})
     
@@ -301,13 +307,13 @@ def benchmark_single_problem(model_config: AIModelConfig, problem_id: str, jutge
                         # Check if it's a rate limit error (UNREPORTED_ERROR) that needs longer wait
                         if "UNREPORTED_ERROR" in error_str or "An error occurred" in error_str:
                             wait_time = min(5 * submission_retries, 30)  # Exponential backoff: 5s, 10s, 15s (max 30s)
-                            logger.warning(f"Jutge rate limit detected on attempt {submission_retries}: {error_str}")
+                            logger.warning("Jutge rate limit detected on attempt %s: %s", submission_retries, error_str)
                             if submission_retries < max_submission_retries:
-                                logger.info(f"Waiting {wait_time}s before retry due to rate limiting...")
+                                logger.info("Waiting %ss before retry due to rate limiting...", wait_time)
                                 time.sleep(wait_time)
                                 continue
                             else:
-                                logger.error(f"Max retries reached for {problem_id} after rate limiting: {error_str}")
+                                logger.error("Max retries reached for %s after rate limiting: %s", problem_id, error_str)
                         
                         # For other errors or max retries reached, record and raise
                         result.error = f"Submission failed: {error_str}"
@@ -329,21 +335,21 @@ def benchmark_single_problem(model_config: AIModelConfig, problem_id: str, jutge
                         if details:
                             result.submission_details = details
                 except Exception as e:
-                    logger.debug(f"Could not fetch submission details: {e}")
+                    logger.debug("Could not fetch submission details: %s", e)
                 
                 if verdict in jutge_config.solver.accepted_verdicts:
                     break
                     
             except Exception as e:
-                logger.error(f"Problem {problem_id} attempt {attempt + 1} failed: {e}")
+                logger.error("Problem %s attempt %s failed: %s", problem_id, attempt + 1, e)
                 if attempt == max_attempts - 1:
                     result.error = str(e)
         
         result.total_time = result.generation_time + result.submission_time
-        logger.info(f"Problem {problem_id} result: {result.verdict} ({result.attempts} attempts, {result.total_time:.2f}s)")
+        logger.info("Problem %s result: %s (%s attempts, %.2fs)", problem_id, result.verdict, result.attempts, result.total_time)
         
     except Exception as e:
-        logger.error(f"Failed to benchmark problem {problem_id}: {e}")
+        logger.error("Failed to benchmark problem %s: %s", problem_id, e)
         result.error = str(e)
         result.verdict = "ERROR"
     
@@ -367,20 +373,20 @@ def _wait_for_verdict_standalone(jutge_client: JutgeApiClient, problem_id: str,
                 elif hasattr(state, 'verdict'):
                     return state.verdict
                 else:
-                    logger.warning(f"Submission done but no verdict found in state object")
+                    logger.warning("Submission done but no verdict found in state object")
                     return "NO_VERDICT"
             
             # Log current state for debugging
             current_state = getattr(state, 'state', 'unknown')
-            logger.debug(f"Submission {submission_id} state: {current_state}")
+            logger.debug("Submission %s state: %s", submission_id, current_state)
                 
         except Exception as e:
-            logger.error(f"Error checking submission status: {e}")
+            logger.error("Error checking submission status: %s", e)
             # Don't give up immediately on errors
             
         time.sleep(2)
     
-    logger.warning(f"Verdict polling timeout for submission {submission_id}")
+    logger.warning("Verdict polling timeout for submission %s", submission_id)
     return "TIMEOUT"
 
 
@@ -425,24 +431,24 @@ class AIModelBenchmark:
         if not models:
             raise ValueError("No enabled models found")
         
-        self.logger.info(f"Starting benchmark for problem set: {problem_set_name}")
-        self.logger.info(f"Problems: {problem_ids}")
-        self.logger.info(f"Models: {[m.name for m in models]}")
-        self.logger.info(f"Language: {language}")
+        self.logger.info("Starting benchmark for problem set: %s", problem_set_name)
+        self.logger.info("Problems: %s", problem_ids)
+        self.logger.info("Models: %s", [m.name for m in models])
+        self.logger.info("Language: %s", language)
         
         start_time = time.time()
         
         # Jutge authentication already done in __init__
         
         # Run benchmarks in parallel
-        self.logger.info(f"Running benchmarks with {self.max_workers} workers using {'processes' if self.use_processes else 'threads'}")
+        self.logger.info("Running benchmarks with %s workers using %s", self.max_workers, 'processes' if self.use_processes else 'threads')
         if self.benchmark_config.parallel_strategy == "full":
             self._benchmark_models_parallel(models, problem_ids, language)
         elif self.benchmark_config.parallel_strategy == "models":
             self._benchmark_models_sequential_problems_parallel(models, problem_ids, language)
         else:  # sequential fallback
             for model_config in models:
-                self.logger.info(f"Benchmarking model: {model_config.name}")
+                self.logger.info("Benchmarking model: %s", model_config.name)
                 self._benchmark_model(model_config, problem_ids, language)
         
         total_time = time.time() - start_time
@@ -472,7 +478,7 @@ class AIModelBenchmark:
             for problem_id in problem_ids:
                 tasks.append((model_config, problem_id))
         
-        self.logger.info(f"Created {len(tasks)} benchmark tasks")
+        self.logger.info("Created %s benchmark tasks", len(tasks))
         
         # Choose executor based on configuration
         executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
@@ -485,7 +491,8 @@ class AIModelBenchmark:
                 raw_logging_config = {
                     'save_raw_responses': self.benchmark_config.save_raw_responses,
                     'raw_responses_dir': self.benchmark_config.raw_responses_dir,
-                    'save_raw_on_failure_only': self.benchmark_config.save_raw_on_failure_only
+                    'save_raw_on_failure_only': self.benchmark_config.save_raw_on_failure_only,
+                    'include_step1': self.benchmark_config.include_step1
                 }
                 
                 future = executor.submit(
@@ -506,9 +513,9 @@ class AIModelBenchmark:
                 try:
                     result = future.result()
                     self.results.append(result)
-                    self.logger.info(f"Completed {model_name} on {problem_id}: {result.verdict}")
+                    self.logger.info("Completed %s on %s: %s", model_name, problem_id, result.verdict)
                 except Exception as e:
-                    self.logger.error(f"Task {model_name}/{problem_id} failed: {e}")
+                    self.logger.error("Task %s/%s failed: %s", model_name, problem_id, e)
                     # Create error result
                     error_result = BenchmarkResult(model_name, problem_id)
                     error_result.error = str(e)
@@ -518,7 +525,7 @@ class AIModelBenchmark:
     def _benchmark_models_sequential_problems_parallel(self, models: List[AIModelConfig], problem_ids: List[str], language: str) -> None:
         """Benchmark models sequentially, but problems within each model in parallel"""
         for model_config in models:
-            self.logger.info(f"Benchmarking model: {model_config.name}")
+            self.logger.info("Benchmarking model: %s", model_config.name)
             self._benchmark_model_parallel(model_config, problem_ids, language)
     
     def _benchmark_model_parallel(self, model_config: AIModelConfig, problem_ids: List[str], language: str) -> None:
@@ -533,7 +540,8 @@ class AIModelBenchmark:
                 raw_logging_config = {
                     'save_raw_responses': self.benchmark_config.save_raw_responses,
                     'raw_responses_dir': self.benchmark_config.raw_responses_dir,
-                    'save_raw_on_failure_only': self.benchmark_config.save_raw_on_failure_only
+                    'save_raw_on_failure_only': self.benchmark_config.save_raw_on_failure_only,
+                    'include_step1': self.benchmark_config.include_step1
                 }
                 
                 future = executor.submit(
@@ -554,9 +562,9 @@ class AIModelBenchmark:
                 try:
                     result = future.result()
                     self.results.append(result)
-                    self.logger.info(f"  Problem {problem_id}: {result.verdict} ({result.attempts} attempts, {result.total_time:.2f}s)")
+                    self.logger.info("  Problem %s: %s (%s attempts, %.2fs)", problem_id, result.verdict, result.attempts, result.total_time)
                 except Exception as e:
-                    self.logger.error(f"  Problem {problem_id} failed: {e}")
+                    self.logger.error("  Problem %s failed: %s", problem_id, e)
                     # Create error result
                     error_result = BenchmarkResult(model_config.name, problem_id)
                     error_result.error = str(e)
@@ -564,84 +572,93 @@ class AIModelBenchmark:
                     self.results.append(error_result)
     
     def _benchmark_model(self, model_config: AIModelConfig, problem_ids: List[str], language: str) -> None:
-        """Benchmark a single model on all problems"""
+        """
+        Benchmark a single model on all problems
+        
+        Each attempt round generates and submits a solution for every problem still unsolved, then
+        polls all of the round's verdicts together, so judging overlaps with generation instead of
+        every problem waiting on its own verdict.
+        """
         adapter = AIModelAdapter(model_config)
+        verdict_manager = VerdictManager(self.jutge_client, self.jutge_config.jutge,
+                                         self.jutge_config.solver.accepted_verdicts)
         
+        results = {}
+        unsolved = {}
         for problem_id in problem_ids:
-            self.logger.info(f"  Problem {problem_id}")
             result = BenchmarkResult(model_config.name, problem_id)
+            results[problem_id] = result
             
             try:
                 # Get problem data
                 problem_info = self.problem_analyzer.analyze_problem(problem_id)
                 if not problem_info or not problem_info.get("success"):
                     raise Exception(f"Failed to fetch problem {problem_id}")
-                
-                problem_data = problem_info  # Use the analyzed problem info
-                
-                # Attempt to solve
-                for attempt in range(self.benchmark_config.max_attempts_per_problem):
-                    result.attempts = attempt + 1
-                    
-                    try:
-                        # Generate solution
-                        solution, tokens, gen_time = adapter.generate_solution(problem_data, language)
-                        result.solution_code = solution
-                        result.tokens_used = tokens
-                        result.generation_time = gen_time
-                        result.language = language
-                        
-                        # Submit solution
-                        submission_start = time.time()
-                        submission_id = self.jutge_client.student.submissions.submit(
-                            problem_id, 
-                            language,
-                            solution,
-                            f"Benchmark test by {model_config.name}"
-                        )
-                        result.submission_time = time.time() - submission_start
-                        result.submission_id = submission_id
-                        
-                        # Wait for verdict
-                        verdict = self._wait_for_verdict(problem_id, submission_id)
-                        result.verdict = verdict
-                        
-                        if verdict in self.jutge_config.solver.accepted_verdicts:
-                            break
-                            
-                    except Exception as e:
-                        self.logger.error(f"    Attempt {attempt + 1} failed: {e}")
-                        if attempt == self.benchmark_config.max_attempts_per_problem - 1:
-                            result.error = str(e)
-                
-                result.total_time = result.generation_time + result.submission_time
-                self.logger.info(f"    Result: {result.verdict} ({result.attempts} attempts, {result.total_time:.2f}s)")
+                unsolved[problem_id] = problem_info  # Use the analyzed problem info
                 
             except Exception as e:
-                self.logger.error(f"    Failed to benchmark: {e}")
+                self.logger.error("  Problem %s failed to benchmark: %s", problem_id, e)
                 result.error = str(e)
                 result.verdict = "ERROR"
-            
-            self.results.append(result)
-    
-    def _wait_for_verdict(self, problem_id: str, submission_id: str, timeout: int = 60) -> str:
-        """Wait for submission verdict"""
-        start_time = time.time()
         
-        while time.time() - start_time < timeout:
-            try:
-                # Get submission status
-                state = self.jutge_client.student.submissions.get(problem_id, submission_id)
+        max_attempts = self.benchmark_config.max_attempts_per_problem
+        for attempt in range(max_attempts):
+            if not unsolved:
+                break
+            
+            submissions = {}
+            for problem_id, problem_data in unsolved.items():
+                self.logger.info("  Problem %s (attempt %s)", problem_id, attempt + 1)
+                result = results[problem_id]
+                result.attempts = attempt + 1
                 
-                if state.state == "done":
-                    return state.veredict  # Note: 'veredict' is the actual field name in the API
+                try:
+                    # Generate solution
+                    solution, tokens, gen_time = adapter.generate_solution(problem_data, language)
+                    result.solution_code = solution
+                    result.tokens_used = tokens
+                    result.generation_time = gen_time
+                    result.language = language
                     
-            except Exception as e:
-                self.logger.error(f"Error checking submission status: {e}")
-                
-            time.sleep(2)
+                    # Submit solution
+                    submission_start = time.time()
+                    submission_id = self.jutge_client.student.submissions.submit(
+                        problem_id, 
+                        language,
+                        solution,
+                        f"Benchmark test by {model_config.name}"
+                    )
+                    result.submission_time = time.time() - submission_start
+                    result.submission_id = submission_id
+                    submissions[submission_id] = problem_id
+                    
+                except Exception as e:
+                    self.logger.error("    Attempt %s failed: %s", attempt + 1, e)
+                    if attempt == max_attempts - 1:
+                        result.error = str(e)
+            
+            # Wait for the verdicts of the whole round
+            verdicts = verdict_manager.get_verdicts(submissions, max_workers=self.max_workers)
+            for submission_id, problem_id in submissions.items():
+                verdict_info = verdicts[submission_id]
+                result = results[problem_id]
+                if "verdict" in verdict_info:
+                    result.verdict = verdict_info["verdict"]
+                    result.error = None
+                elif verdict_info.get("timeout"):
+                    result.verdict = "TIMEOUT"
+                else:
+                    # The verdict check itself failed; keep its error instead of reporting a timeout
+                    result.verdict = "ERROR"
+                    result.error = verdict_info.get("error")
+                if result.verdict in self.jutge_config.solver.accepted_verdicts:
+                    del unsolved[problem_id]
         
-        return "TIMEOUT"
+        for problem_id in problem_ids:
+            result = results[problem_id]
+            result.total_time = result.generation_time + result.submission_time
+            self.logger.info("  Problem %s result: %s (%s attempts, %.2fs)", problem_id, result.verdict, result.attempts, result.total_time)
+            self.results.append(result)
     
     def _generate_summary(self, total_time: float) -> Dict[str, Any]:
         """Generate benchmark summary statistics"""
@@ -704,4 +721,4 @@ class AIModelBenchmark:
         with open(filename, 'w') as f:
             json.dump(data, f, indent=2)
         
-        self.logger.info(f"Results saved to {filename}") 
\ No newline at end of file
+        self.logger.info("Results saved to %s", filename) 
\ No newline at end of file
@@ -39,6 +39,7 @@ class BenchmarkConfig(BaseModel):
     save_raw_responses: bool = True  # Enable raw response logging for debugging
     raw_responses_dir: str = "results/raw_responses"  # Directory to save raw responses
     save_raw_on_failure_only: bool = False  # Only save raw responses when extraction/execution fails
+    include_step1: bool = False  # Keep the step 1 response in the in-memory generation result
     
     @classmethod
     def create_default(cls) -> "BenchmarkConfig":
@@ -15,10 +15,21 @@ class OpenAIConfig(BaseModel):
     """OpenAI API configuration"""
     api_key: Optional[str] = None
     model: str = "gpt-4o-mini"
+    formatter_model: Optional[str] = None  # Cheaper model for the step 2 reformat, e.g. "gpt-4o-mini" (None = same as model)
+    trivial_templates: bool = False  # Solve echo/a+b/min/max problems from a template on the first attempt, without the API
+    fast_model: Optional[str] = None  # Cheaper model for the first attempt; retries use model (None = always model)
     max_tokens: int = 2000
+    adaptive_max_tokens: bool = False  # Cap step 1 at 256 + statement length / 4 tokens (never above max_tokens)
     temperature: float = 0.1
     timeout: int = 30
     base_url: Optional[str] = None
+    verbose: bool = True  # Print per-attempt progress while generating solutions
+    stream_step1: bool = False  # Stream step 1 and stop once the solution code block is complete
+    stream_step2: bool = False  # Stream step 2 and stop once the code block for the target language is complete
+    max_retries: int = 5  # Retries with exponential backoff on rate limits (429) and transient errors
+    max_concurrent_requests: Optional[int] = None  # Cap on API calls in flight across batch workers (None = no cap)
+    response_cache_path: Optional[str] = None  # SQLite file caching generated solutions, e.g. ~/.jutge_solver/cache.db (None = disabled)
+    response_cache_ttl: Optional[int] = None  # Seconds before a cached solution is regenerated (None = never)
 
 
 class JutgeConfig(BaseModel):
@@ -28,6 +39,9 @@ class JutgeConfig(BaseModel):
     default_compiler: str = "Python3"
     submission_timeout: int = 60
     max_retries: int = 3
+    submit_concurrency: int = 8  # Solutions submitted at once when a batch is submitted together
+    verdict_cache_path: Optional[str] = None  # SQLite file caching verdicts by submitted code, e.g. ~/.jutge_solver/verdicts.db (None = always submit)
+    verdict_times_path: Optional[str] = None  # JSON history of verdict times that places polls, e.g. ~/.jutge_solver/verdict_times.json (None = backoff only)
 
 
 class SolverConfig(BaseModel):
@@ -37,6 +51,7 @@ class SolverConfig(BaseModel):
     enable_local_testing: bool = True
     log_level: str = "INFO"
     accepted_verdicts: list[str] = ["AC", "PE"]  # Verdicts considered as correct answers
+    batch_workers: int = 4  # Problems solved concurrently in batch mode
 
 
 class Config(BaseModel):
@@ -58,6 +73,8 @@ class Config(BaseModel):
             config.openai.base_url = "https://openrouter.ai/api/v1"
         if model := os.getenv("OPENAI_MODEL"):
             config.openai.model = model
+        if formatter_model := os.getenv("OPENAI_FORMATTER_MODEL"):
+            config.openai.formatter_model = formatter_model
         if email := os.getenv("JUTGE_EMAIL"):
             config.jutge.email = email
         if password := os.getenv("JUTGE_PASSWORD"):
@@ -3,6 +3,7 @@ Problem analysis module for extracting and parsing problem information
 """
 
 import re
+import base64
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
@@ -10,6 +11,16 @@ from rich.console import Console
 
 console = Console()
 
+# Explicit "Sample Input" / "Sample Output" sections in a problem statement
+SAMPLE_INPUT_RE = re.compile(
+    r"(?:Sample\s+Input|Input\s+Example).*?:\s*(.*?)(?=Sample\s+Output|Output\s+Example|$)",
+    re.IGNORECASE | re.DOTALL
+)
+SAMPLE_OUTPUT_RE = re.compile(
+    r"(?:Sample\s+Output|Output\s+Example).*?:\s*(.*?)(?=\n\n|$)",
+    re.IGNORECASE | re.DOTALL
+)
+
 
 class ProblemAnalyzer:
     """Analyzes Jutge problems to extract key information for solution generation"""
@@ -45,8 +56,8 @@ class ProblemAnalyzer:
                 "author": problem_rich.abstract_problem.author,
                 "statement": statement,
                 "abstract_problem": problem_rich.abstract_problem,
-                "sample_testcases": problem_rich.sample_testcases,
-                "public_testcases": public_testcases,
+                "sample_testcases": self._decode_testcases(problem_rich.sample_testcases),
+                "public_testcases": self._decode_testcases(public_testcases),
                 "parsed_info": parsed_info,
                 "problem": problem_rich,  # Keep the full problem object
                 "timestamp": datetime.now().isoformat()
@@ -64,6 +75,39 @@ class ProblemAnalyzer:
                 "timestamp": datetime.now().isoformat()
             }
     
+    def _decode_testcases(self, testcases) -> List[Dict[str, Any]]:
+        """
+        Convert testcases to dicts and decode their base64 input/output once
+        
+        Args:
+            testcases: Testcases from the API (objects or dicts)
+            
+        Returns:
+            List of dicts with name, input_b64, correct_b64 and, when decodable, input and output
+        """
+        decoded = []
+        for testcase in testcases or []:
+            if isinstance(testcase, dict):
+                entry = dict(testcase)
+            else:
+                entry = {
+                    "name": getattr(testcase, "name", ""),
+                    "input_b64": getattr(testcase, "input_b64", ""),
+                    "correct_b64": getattr(testcase, "correct_b64", "")
+                }
+            
+            try:
+                entry["input"] = base64.b64decode(entry.get("input_b64", "")).decode("utf-8", errors="replace")
+                entry["output"] = base64.b64decode(entry.get("correct_b64", "")).decode("utf-8", errors="replace")
+            except Exception:
+                # Keep the raw fields; consumers fall back to decoding (and skipping) themselves
+                entry.pop("input", None)
+                entry.pop("output", None)
+            
+            decoded.append(entry)
+        
+        return decoded
+    
     def _parse_problem_statement(self, statement: str) -> Dict[str, Any]:
         """
         Parse the problem statement to extract key information
@@ -167,11 +211,8 @@ class ProblemAnalyzer:
         
         # Look for common patterns
         # Pattern 1: Explicit "Sample Input" and "Sample Output" sections
-        input_pattern = r"(?:Sample\s+Input|Input\s+Example).*?:\s*(.*?)(?=Sample\s+Output|Output\s+Example|$)"
-        output_pattern = r"(?:Sample\s+Output|Output\s+Example).*?:\s*(.*?)(?=\n\n|$)"
-        
-        input_matches = re.findall(input_pattern, statement, re.IGNORECASE | re.DOTALL)
-        output_matches = re.findall(output_pattern, statement, re.IGNORECASE | re.DOTALL)
+        input_matches = SAMPLE_INPUT_RE.findall(statement)
+        output_matches = SAMPLE_OUTPUT_RE.findall(statement)
         
         for i, (inp, out) in enumerate(zip(input_matches, output_matches)):
             sample_cases.append({
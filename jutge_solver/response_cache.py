@@ -0,0 +1,84 @@
+"""
+Persistent cache of generated solutions, so re-solving a problem does not spend tokens again
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """SQLite-backed exact-match cache of solution generation results"""
+    
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        """
+        Open (or create) the cache database
+        
+        Args:
+            path: SQLite file path ("~" is expanded)
+            ttl: Seconds after which an entry is ignored (None = entries never expire)
+        """
+        path = os.path.expanduser(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.ttl = ttl
+        
+        # One connection shared by the worker threads of a batch run, serialized by the lock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, "
+                "problem_id TEXT, "
+                "compiler_id TEXT, "
+                "model TEXT, "
+                "result TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the cached result for a key, or None if missing or expired"""
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT result, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            # The cache is only an optimization: a broken database means a cache miss
+            logger.warning("Response cache lookup failed: %s", e)
+            return None
+        
+        if row is None:
+            return None
+        
+        result, created_at = row
+        if self.ttl is not None and time.time() - created_at > self.ttl:
+            return None
+        return json.loads(result)
+    
+    def put(self, key: str, result: Dict[str, Any], problem_id: Optional[str] = None,
+            compiler_id: Optional[str] = None, model: Optional[str] = None) -> None:
+        """Store a result, replacing any previous entry for the key"""
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, problem_id, compiler_id, model, result, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, problem_id, compiler_id, model, json.dumps(result, default=str), time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning("Response cache store failed: %s", e)
+    
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
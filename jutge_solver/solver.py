@@ -4,24 +4,26 @@ Main Jutge Problem Solver class
 
 import sys
 import os
+import hashlib
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Add parent directory to path for jutge_api_client import
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-
-import openai
 from rich.console import Console
 
-from jutge_api_client import JutgeApiClient
 from .config import Config
 from .problem_analyzer import ProblemAnalyzer
+from .response_cache import ResponseCache
 from .solution_generator import SolutionGenerator
 from .verdict_manager import VerdictManager
 
 console = Console()
 
+# Verdicts that always repeat for the same code, so a cached one can stand in for a resubmission
+# (TLE, RE and IE depend on the judge's load and are always resubmitted)
+CACHEABLE_VERDICTS = {"AC", "WA", "PE", "CE"}
+
 
 class JutgeProblemSolver:
     """Main class for solving Jutge problems using OpenAI API"""
@@ -37,22 +39,38 @@ class JutgeProblemSolver:
         )
         self.logger = logging.getLogger(__name__)
         
+        # The API clients are imported here rather than at module level, so importing the package
+        # (e.g. only for ProblemAnalyzer) doesn't load openai and its HTTP stack
+        import openai
+        
+        # jutge_api_client.py lives next to the package rather than inside it
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if root_dir not in sys.path:
+            sys.path.insert(0, root_dir)
+        from jutge_api_client import JutgeApiClient
+        
         # Initialize components
         self.jutge_client = JutgeApiClient()
         self.openai_client = openai.OpenAI(
             api_key=self.config.openai.api_key,
             base_url=self.config.openai.base_url,
+            max_retries=self.config.openai.max_retries,
         )
         self.problem_analyzer = ProblemAnalyzer(self.jutge_client)
         # Raw logging config for debugging AI responses  
         raw_logging_config = {
             'save_raw_responses': getattr(self.config.solver, 'save_raw_responses', False),
             'raw_responses_dir': getattr(self.config.solver, 'raw_responses_dir', 'results/raw_responses'),
-            'save_raw_on_failure_only': getattr(self.config.solver, 'save_raw_on_failure_only', False)
+            'save_raw_on_failure_only': getattr(self.config.solver, 'save_raw_on_failure_only', False),
+            'include_step1': getattr(self.config.solver, 'include_step1', False)
         }
         self.solution_generator = SolutionGenerator(self.openai_client, self.config.openai, raw_logging_config)
         self.verdict_manager = VerdictManager(self.jutge_client, self.config.jutge, self.config.solver.accepted_verdicts)
         
+        # Optional cache of verdicts by submitted code, so resubmitting identical code is skipped
+        verdict_cache_path = getattr(self.config.jutge, 'verdict_cache_path', None)
+        self.verdict_cache = ResponseCache(verdict_cache_path) if isinstance(verdict_cache_path, str) else None
+        
         self._authenticated = False
     
     def authenticate(self) -> bool:
@@ -68,7 +86,7 @@ class JutgeProblemSolver:
             return True
         except Exception as e:
             console.print(f"[red]✗ Authentication failed: {e}[/red]")
-            self.logger.error(f"Authentication failed: {e}")
+            self.logger.error("Authentication failed: %s", e)
             return False
     
     def solve_problem(self, problem_id: str, compiler_id: Optional[str] = None) -> Dict[str, Any]:
@@ -117,42 +135,245 @@ class JutgeProblemSolver:
                 results["error"] = "Failed to generate solution"
                 return results
             
-            # Step 3: Submit solution
-            console.print("[blue]📤 Submitting solution...[/blue]")
-            submission_result = self._submit_solution(
-                problem_id,
-                target_compiler,
-                solution_result["code"]
-            )
-            results["steps"]["submission"] = submission_result
+            # Steps 3 and 4: Submit solution and get verdict
+            self._submit_and_judge(results, target_compiler, solution_result["code"], workflow_start)
             
-            if not submission_result["success"]:
-                results["error"] = "Failed to submit solution"
-                return results
+        except Exception as e:
+            console.print(f"[red]✗ Workflow failed: {e}[/red]")
+            self.logger.error("Workflow failed: %s", e)
+            results["error"] = str(e)
+        
+        return results
+    
+    def _submit_and_judge(self, results: Dict[str, Any], compiler_id: str, code: str,
+                          workflow_start: datetime) -> None:
+        """Submit a generated solution, wait for its verdict and record both in the workflow results"""
+        if self._record_cached_verdict(results, compiler_id, code, workflow_start):
+            return
+        
+        # Step 3: Submit solution
+        submission_id = self._record_submission(results, compiler_id, code)
+        if submission_id is None:
+            return
+        
+        # Step 4: Get verdict
+        console.print("[blue]⏳ Waiting for verdict...[/blue]")
+        verdict_result = self.verdict_manager.get_verdict(results["problem_id"], submission_id, compiler_id)
+        self._cache_verdict(results["problem_id"], compiler_id, code, verdict_result)
+        self._record_verdict(results, verdict_result, workflow_start)
+    
+    def _verdict_cache_key(self, problem_id: str, compiler_id: str, code: str) -> str:
+        """Key of a verdict in the verdict cache: the submitted code, problem and compiler"""
+        return f"{hashlib.sha256(code.encode('utf-8')).hexdigest()}:{problem_id}:{compiler_id}"
+    
+    def _record_cached_verdict(self, results: Dict[str, Any], compiler_id: str, code: str,
+                               workflow_start: datetime) -> bool:
+        """Record the cached verdict of identical code instead of submitting it, if there is one"""
+        if self.verdict_cache is None:
+            return False
+        
+        cached_verdict = self.verdict_cache.get(self._verdict_cache_key(results["problem_id"], compiler_id, code))
+        if not cached_verdict:
+            return False
+        
+        console.print("[green]✓ Same code was judged before, reusing its verdict[/green]")
+        results["steps"]["submission"] = {"success": True, "cached": True, "compiler_id": compiler_id}
+        self._record_verdict(results, dict(cached_verdict, cached=True), workflow_start)
+        return True
+    
+    def _cache_verdict(self, problem_id: str, compiler_id: str, code: str, verdict_result: Dict[str, Any]) -> None:
+        """Store a deterministic verdict in the verdict cache"""
+        if self.verdict_cache is not None and verdict_result.get("verdict") in CACHEABLE_VERDICTS:
+            self.verdict_cache.put(self._verdict_cache_key(problem_id, compiler_id, code), verdict_result,
+                                   problem_id, compiler_id)
+    
+    def _record_submission(self, results: Dict[str, Any], compiler_id: str, code: str) -> Optional[str]:
+        """Submit a generated solution and record it in the workflow results, returning the submission ID"""
+        console.print("[blue]📤 Submitting solution...[/blue]")
+        submission_result = self._submit_solution(results["problem_id"], compiler_id, code)
+        results["steps"]["submission"] = submission_result
+        
+        if not submission_result["success"]:
+            results["error"] = "Failed to submit solution"
+            return None
+        return submission_result["submission_id"]
+    
+    def _record_verdict(self, results: Dict[str, Any], verdict_result: Dict[str, Any],
+                        workflow_start: datetime) -> None:
+        """Record a verdict in the workflow results and print the summary"""
+        results["steps"]["verdict"] = verdict_result
+        
+        results["success"] = True
+        results["final_verdict"] = verdict_result.get("verdict", "UNKNOWN")
+        
+        # Summary
+        duration = (datetime.now() - workflow_start).total_seconds()
+        results["duration_seconds"] = duration
+        
+        self._print_summary(results)
+    
+    def solve_problems(self, problem_ids: List[str], compiler_id: Optional[str] = None,
+                       max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Solve several problems concurrently.
+        
+        Each problem runs the full solve_problem workflow in a worker thread; the
+        work is dominated by OpenAI and Jutge network round-trips, so threads
+        overlap the waiting time of up to max_workers problems at once.
+        
+        Args:
+            problem_ids: Jutge problem IDs to solve
+            compiler_id: Optional compiler override applied to every problem
+            max_workers: Concurrency limit (defaults to solver.batch_workers)
             
-            # Step 4: Get verdict
-            console.print("[blue]⏳ Waiting for verdict...[/blue]")
-            verdict_result = self.verdict_manager.get_verdict(
-                problem_id,
-                submission_result["submission_id"]
-            )
-            results["steps"]["verdict"] = verdict_result
+        Returns:
+            List of workflow results in the same order as problem_ids
+        """
+        if not problem_ids:
+            return []
+        
+        # Authenticate once up front so the workers don't race to log in
+        if not self.authenticate():
+            return [{"problem_id": problem_id, "success": False, "error": "Authentication failed"}
+                    for problem_id in problem_ids]
+        
+        workers = max_workers or getattr(self.config.solver, 'batch_workers', 1)
+        workers = max(1, min(workers, len(problem_ids)))
+        
+        if workers == 1:
+            return [self.solve_problem(problem_id, compiler_id) for problem_id in problem_ids]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(problem_ids)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future_to_index = {
+                executor.submit(self.solve_problem, problem_id, compiler_id): index
+                for index, problem_id in enumerate(problem_ids)
+            }
             
-            results["success"] = True
-            results["final_verdict"] = verdict_result.get("verdict", "UNKNOWN")
+            for future in as_completed(future_to_index):
+                index = future_to_index[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    self.logger.error("Problem %s failed: %s", problem_ids[index], e)
+                    results[index] = {
+                        "problem_id": problem_ids[index],
+                        "success": False,
+                        "error": str(e)
+                    }
+        
+        return results
+    
+    def solve_problems_batch(self, problem_ids: List[str], compiler_id: Optional[str] = None,
+                             max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Solve several problems with solutions generated through the OpenAI Batch API.
+        
+        Generation costs half as much as in solve_problems but can take up to 24 hours.
+        Problems are read and verdicts polled concurrently with up to max_workers threads;
+        the solutions are submitted up to jutge.submit_concurrency at a time.
+        
+        Args:
+            problem_ids: Jutge problem IDs to solve
+            compiler_id: Optional compiler override applied to every problem
+            max_workers: Concurrency limit for reading and submitting (defaults to solver.batch_workers)
             
-            # Summary
-            duration = (datetime.now() - workflow_start).total_seconds()
-            results["duration_seconds"] = duration
+        Returns:
+            List of workflow results in the same order as problem_ids
+        """
+        if not problem_ids:
+            return []
+        
+        if not self.authenticate():
+            return [{"problem_id": problem_id, "success": False, "error": "Authentication failed"}
+                    for problem_id in problem_ids]
+        
+        workflow_start = datetime.now()
+        workers = max_workers or getattr(self.config.solver, 'batch_workers', 1)
+        workers = max(1, min(workers, len(problem_ids)))
+        
+        results = {
+            problem_id: {
+                "problem_id": problem_id,
+                "timestamp": workflow_start.isoformat(),
+                "success": False,
+                "steps": {}
+            }
+            for problem_id in problem_ids
+        }
+        
+        # Step 1: Read and analyze every problem
+        console.print(f"[blue]📖 Reading {len(results)} problems...[/blue]")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            analyses = list(executor.map(self.problem_analyzer.analyze_problem, results))
+        # zip() would silently drop problems if the lists ever differed in length
+        assert len(analyses) == len(results), "every problem must have an analysis"
+        problem_infos = dict(zip(results, analyses))
+        
+        problems = {}
+        for problem_id, problem_info in problem_infos.items():
+            results[problem_id]["steps"]["problem_analysis"] = problem_info
+            if problem_info["success"]:
+                problems[problem_id] = (problem_info, compiler_id or self._select_compiler(problem_info))
+            else:
+                results[problem_id]["error"] = "Failed to read problem"
+        
+        # Step 2: Generate every solution in OpenAI batches
+        console.print(f"[blue]🤖 Generating {len(problems)} solutions with the OpenAI Batch API...[/blue]")
+        generations = self.solution_generator.generate_solutions_batch(problems) if problems else {}
+        
+        to_submit = []
+        for problem_id, solution_result in generations.items():
+            results[problem_id]["steps"]["solution_generation"] = solution_result
+            if not solution_result["success"]:
+                results[problem_id]["error"] = "Failed to generate solution"
+                continue
             
-            self._print_summary(results)
+            target_compiler, code = problems[problem_id][1], solution_result["code"]
+            if not self._record_cached_verdict(results[problem_id], target_compiler, code, workflow_start):
+                to_submit.append((problem_id, target_compiler, code))
+        
+        if not to_submit:
+            return [results[problem_id] for problem_id in problem_ids]
+        
+        # Step 3: Submit every solution before waiting for any verdict
+        def submit(problem_id: str, target_compiler: str, code: str) -> Optional[str]:
+            try:
+                return self._record_submission(results[problem_id], target_compiler, code)
+            except Exception as e:
+                self.logger.error("Problem %s failed: %s", problem_id, e)
+                results[problem_id]["error"] = str(e)
+                return None
+        
+        submit_workers = max(1, min(getattr(self.config.jutge, 'submit_concurrency', 1), len(to_submit)))
+        with ThreadPoolExecutor(max_workers=submit_workers) as executor:
+            submission_ids = list(executor.map(lambda item: submit(*item), to_submit))
+        assert len(submission_ids) == len(to_submit), "every solution must have a submission result"
+        submissions = {problem_id: submission_id
+                       for (problem_id, _, _), submission_id in zip(to_submit, submission_ids)
+                       if submission_id is not None}
+        submitted = {problem_id: (target_compiler, code) for problem_id, target_compiler, code in to_submit}
+        
+        # Step 4: Get the verdicts, polling every pending submission in the same loop
+        if submissions:
+            console.print(f"[blue]⏳ Waiting for {len(submissions)} verdicts...[/blue]")
+            try:
+                verdicts = self.verdict_manager.get_verdicts(
+                    {submission_id: problem_id for problem_id, submission_id in submissions.items()},
+                    max_workers=workers
+                )
+            except Exception as e:
+                self.logger.error("Verdict polling failed: %s", e)
+                verdicts = {}
+                for problem_id in submissions:
+                    results[problem_id]["error"] = str(e)
             
-        except Exception as e:
-            console.print(f"[red]✗ Workflow failed: {e}[/red]")
-            self.logger.error(f"Workflow failed: {e}")
-            results["error"] = str(e)
+            for problem_id, submission_id in submissions.items():
+                if submission_id in verdicts:
+                    self._cache_verdict(problem_id, *submitted[problem_id], verdicts[submission_id])
+                    self._record_verdict(results[problem_id], verdicts[submission_id], workflow_start)
         
-        return results
+        return [results[problem_id] for problem_id in problem_ids]
     
     def _select_compiler(self, problem_info: Dict[str, Any]) -> str:
         """Select appropriate compiler based on problem analysis"""
@@ -183,7 +404,7 @@ class JutgeProblemSolver:
             
         except Exception as e:
             console.print(f"[red]✗ Submission failed: {e}[/red]")
-            self.logger.error(f"Submission failed: {e}")
+            self.logger.error("Submission failed: %s", e)
             return {
                 "success": False,
                 "error": str(e)
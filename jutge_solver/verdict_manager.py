@@ -2,16 +2,84 @@
 Verdict management module for polling and handling submission results
 """
 
+import heapq
+import random
+import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
 from datetime import datetime
 
 from rich.console import Console
 
+from .verdict_timing import VerdictTimingStats
+
 console = Console()
 logger = logging.getLogger(__name__)
 
+# Delay between polls of one submission: short at first for quick verdicts (CE comes back almost at
+# once), then growing by the factor after every poll up to the cap
+POLL_BACKOFF_START = 0.5  # seconds
+POLL_BACKOFF_FACTOR = 1.5
+POLL_BACKOFF_MAX = 10  # seconds
+POLL_JITTER = 0.1  # Up to this fraction of the delay is added at random, so concurrent pollers spread out
+
+# How long the index of all submissions used by the fallback verdict check is reused before refetching
+SUBMISSIONS_INDEX_TTL = 5  # seconds
+
+# Submission state attributes copied into verdict results when present
+SUBMISSION_DETAIL_ATTRS = ("execution_time", "memory_usage", "score", "compiler_output")
+_MISSING = object()
+
+# Verdict interpretations
+VERDICT_MEANINGS = {
+    "AC": "Accepted ✓",
+    "WA": "Wrong Answer ✗",
+    "TLE": "Time Limit Exceeded ⏰",
+    "CE": "Compilation Error 🔨",
+    "RE": "Runtime Error 💥",
+    "PE": "Presentation Error 📝",
+    "OLE": "Output Limit Exceeded 📄",
+    "MLE": "Memory Limit Exceeded 💾",
+    "IE": "Internal Error ⚠️",
+    "QE": "Queue Error 🚨"
+}
+
+# Verdict groups flagged by interpret_verdict
+RETRYABLE_VERDICTS = frozenset({"CE", "RE", "IE"})  # Errors that might be fixable
+MEMORY_VERDICTS = frozenset({"MLE", "OLE"})
+LOGIC_ERROR_VERDICTS = frozenset({"WA", "PE"})
+
+# Hints on how to fix a rejected solution, by verdict
+VERDICT_SUGGESTIONS = {
+    "WA": (
+        "Check edge cases and boundary conditions",
+        "Verify input/output format matches exactly",
+        "Review algorithm logic"
+    ),
+    "TLE": (
+        "Optimize algorithm complexity",
+        "Use more efficient data structures",
+        "Check for infinite loops"
+    ),
+    "CE": (
+        "Check syntax errors",
+        "Verify all imports and includes",
+        "Ensure proper language syntax"
+    ),
+    "RE": (
+        "Check for array bounds errors",
+        "Handle division by zero",
+        "Verify input parsing"
+    ),
+    "MLE": (
+        "Reduce memory usage",
+        "Use more efficient data structures",
+        "Check for memory leaks"
+    ),
+}
+
 
 class VerdictManager:
     """Manages submission verdict polling and interpretation"""
@@ -21,43 +89,49 @@ class VerdictManager:
         self.config = jutge_config
         self.accepted_verdicts = accepted_verdicts or ["AC"]
         
-        # Verdict interpretations
-        self.verdict_meanings = {
-            "AC": "Accepted ✓",
-            "WA": "Wrong Answer ✗",
-            "TLE": "Time Limit Exceeded ⏰",
-            "CE": "Compilation Error 🔨",
-            "RE": "Runtime Error 💥",
-            "PE": "Presentation Error 📝",
-            "OLE": "Output Limit Exceeded 📄",
-            "MLE": "Memory Limit Exceeded 💾",
-            "IE": "Internal Error ⚠️",
-            "QE": "Queue Error 🚨"
-        }
+        # Optional history of verdict times, used to poll when verdicts usually arrive
+        verdict_times_path = getattr(jutge_config, "verdict_times_path", None)
+        self.timing_stats = VerdictTimingStats(verdict_times_path) if isinstance(verdict_times_path, str) else None
+        
+        # Submissions by ID for the fallback verdict check, shared by concurrent checks
+        self._submissions_index = None
+        self._submissions_index_time = 0.0
+        self._submissions_index_lock = threading.Lock()
+        
+        self.verdict_meanings = VERDICT_MEANINGS
     
-    def get_verdict(self, problem_id: str, submission_id: str) -> Dict[str, Any]:
+    def get_verdict(self, problem_id: str, submission_id: str, compiler_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Poll for verdict until submission is complete
         
+        With a verdict time history, polls are placed where past verdicts of the problem (or
+        compiler) arrived; past that, or without a history, polling backs off exponentially.
+        
         Args:
             problem_id: The problem identifier
             submission_id: The submission identifier
+            compiler_id: The submission's compiler (selects the verdict time history)
             
         Returns:
             Dict containing verdict information
         """
-        start_time = datetime.now()
+        start_time = time.monotonic()
+        deadline = start_time + self.config.submission_timeout
         poll_count = 0
+        delay = POLL_BACKOFF_START
+        schedule = self.timing_stats.poll_schedule(problem_id, compiler_id) if self.timing_stats else []
+        last_pending = 0.0
         
         try:
             console.print(f"  Polling for verdict of submission {submission_id}...")
             
             while True:
                 poll_count += 1
-                elapsed = (datetime.now() - start_time).total_seconds()
+                now = time.monotonic()
+                elapsed = now - start_time
                 
-                # Check timeout
-                if elapsed > self.config.submission_timeout:
+                # Check timeout (the sleeps below stop at the deadline at most)
+                if now >= deadline:
                     return {
                         "success": False,
                         "error": "Verdict polling timeout",
@@ -72,48 +146,148 @@ class VerdictManager:
                     state = self.client.student.submissions.get(problem_id, submission_id)
                     
                     if state.state == "done":
-                        verdict = state.veredict
-                        meaning = self.verdict_meanings.get(verdict, f"Unknown verdict: {verdict}")
-                        
-                        console.print(f"  [{'green' if verdict == 'AC' else 'red'}]Verdict: {meaning}[/{'green' if verdict == 'AC' else 'red'}]")
-                        
-                        return {
-                            "success": True,
-                            "verdict": verdict,
-                            "meaning": meaning,
-                            "state": state.state,
-                            "elapsed_seconds": elapsed,
-                            "polls": poll_count,
-                            "timestamp": datetime.now().isoformat(),
-                            "submission_details": self._extract_submission_details(state)
-                        }
+                        if self.timing_stats:
+                            # The verdict arrived between the last two polls; the midpoint keeps the
+                            # history from piling up on the poll times it produced
+                            self.timing_stats.record(problem_id, compiler_id, (last_pending + elapsed) / 2)
+                        return self._done_verdict(state, elapsed, poll_count)
                     
                     else:
                         # Still processing
                         console.print(f"  Status: {state.state} (poll #{poll_count}, {elapsed:.1f}s)")
-                        time.sleep(2)  # Wait 2 seconds before next poll
+                        last_pending = elapsed
+                        # Wait for the next scheduled poll time, or back off once the schedule is used up
+                        while schedule and schedule[0] <= elapsed:
+                            schedule.pop(0)
+                        if schedule:
+                            wait = schedule.pop(0) - elapsed
+                        else:
+                            wait = self._jittered(delay)
+                            delay = min(delay * POLL_BACKOFF_FACTOR, POLL_BACKOFF_MAX)
+                        # Never sleep past the timeout
+                        time.sleep(max(0, min(wait, deadline - now)))
                 
                 except AttributeError as e:
-                    logger.warning(f"API structure issue: {e}")
+                    logger.warning("API structure issue: %s", e)
                     # Fallback: try alternative API structure
                     return self._try_alternative_verdict_check(problem_id, submission_id, elapsed, poll_count)
                 
                 except Exception as e:
-                    logger.error(f"Error polling verdict: {e}")
-                    time.sleep(1)  # Brief wait before retry
+                    logger.error("Error polling verdict: %s", e)
+                    time.sleep(max(0, min(1, deadline - now)))  # Brief wait before retry
+                    delay = POLL_BACKOFF_START  # The submission may have been judged meanwhile
                     continue
                     
         except Exception as e:
             console.print(f"  [red]✗ Verdict polling failed: {e}[/red]")
-            logger.error(f"Verdict polling failed: {e}")
+            logger.error("Verdict polling failed: %s", e)
             
             return {
                 "success": False,
                 "error": str(e),
-                "elapsed_seconds": (datetime.now() - start_time).total_seconds(),
+                "elapsed_seconds": time.monotonic() - start_time,
                 "polls": poll_count
             }
     
+    def get_verdicts(self, submissions: Dict[str, str], max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """
+        Poll several submissions together until each one has a verdict
+        
+        Submissions due for a poll are checked in parallel, then rescheduled with their own
+        backoff (as in get_verdict), so quick verdicts come back early and slow ones are not
+        polled on every round.
+        
+        Args:
+            submissions: Maps each submission ID to its problem ID
+            max_workers: Polls sent at once
+            
+        Returns:
+            Dict mapping each submission ID to a result shaped like get_verdict's
+        """
+        results = {}
+        if not submissions:
+            return results
+        
+        start_time = time.monotonic()
+        poll_counts = dict.fromkeys(submissions, 0)
+        # Heap of (next poll time, submission ID, delay before the poll after that one)
+        schedule = [(start_time, submission_id, POLL_BACKOFF_START) for submission_id in submissions]
+        heapq.heapify(schedule)
+        
+        console.print(f"  Polling for verdicts of {len(submissions)} submissions...")
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(submissions)))) as executor:
+            while schedule:
+                delay = schedule[0][0] - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                
+                now = time.monotonic()
+                due = []
+                while schedule and schedule[0][0] <= now:
+                    due.append(heapq.heappop(schedule))
+                polls = [
+                    (submission_id, backoff,
+                     executor.submit(self.client.student.submissions.get, submissions[submission_id], submission_id))
+                    for _, submission_id, backoff in due
+                ]
+                
+                for submission_id, backoff, future in polls:
+                    problem_id = submissions[submission_id]
+                    poll_counts[submission_id] += 1
+                    elapsed = time.monotonic() - start_time
+                    
+                    try:
+                        state = future.result()
+                        if state.state == "done":
+                            results[submission_id] = self._done_verdict(state, elapsed, poll_counts[submission_id])
+                            continue
+                    except AttributeError as e:
+                        logger.warning("API structure issue: %s", e)
+                        results[submission_id] = self._try_alternative_verdict_check(
+                            problem_id, submission_id, elapsed, poll_counts[submission_id]
+                        )
+                        continue
+                    except Exception as e:
+                        logger.error("Error polling verdict of %s: %s", submission_id, e)
+                    
+                    if elapsed > self.config.submission_timeout:
+                        results[submission_id] = {
+                            "success": False,
+                            "error": "Verdict polling timeout",
+                            "timeout": True,
+                            "elapsed_seconds": elapsed,
+                            "polls": poll_counts[submission_id]
+                        }
+                        continue
+                    
+                    heapq.heappush(schedule, (now + self._jittered(backoff), submission_id,
+                                              min(backoff * POLL_BACKOFF_FACTOR, POLL_BACKOFF_MAX)))
+        
+        return results
+    
+    def _jittered(self, delay: float) -> float:
+        """Add random jitter to a poll delay"""
+        return delay + random.uniform(0, POLL_JITTER * delay)
+    
+    def _done_verdict(self, state, elapsed: float, poll_count: int) -> Dict[str, Any]:
+        """Build the verdict result of a judged submission"""
+        verdict = state.veredict
+        meaning = self.verdict_meanings.get(verdict, f"Unknown verdict: {verdict}")
+        
+        # Styled directly rather than through markup, which Rich would parse on every verdict
+        console.print(f"  Verdict: {meaning}", style="green" if verdict == "AC" else "red", markup=False)
+        
+        return {
+            "success": True,
+            "verdict": verdict,
+            "meaning": meaning,
+            "state": state.state,
+            "elapsed_seconds": elapsed,
+            "polls": poll_count,
+            "timestamp": datetime.now().isoformat(),
+            "submission_details": self._extract_submission_details(state)
+        }
+    
     def _try_alternative_verdict_check(self, problem_id: str, submission_id: str, 
                                      elapsed: float, poll_count: int) -> Dict[str, Any]:
         """
@@ -125,24 +299,22 @@ class VerdictManager:
             
             # Method 1: Check if we can get recent submissions
             try:
-                submissions = self.client.student.submissions.get_all()
-                for submission in submissions:
-                    if hasattr(submission, 'submission_id') and submission.submission_id == submission_id:
-                        if hasattr(submission, 'veredict') and submission.veredict:
-                            verdict = submission.veredict
-                            meaning = self.verdict_meanings.get(verdict, f"Unknown verdict: {verdict}")
-                            
-                            return {
-                                "success": True,
-                                "verdict": verdict,
-                                "meaning": meaning,
-                                "method": "alternative_check",
-                                "elapsed_seconds": elapsed,
-                                "polls": poll_count,
-                                "timestamp": datetime.now().isoformat()
-                            }
+                submission = self._get_submissions_index().get(submission_id)
+                if submission is not None and getattr(submission, 'veredict', None):
+                    verdict = submission.veredict
+                    meaning = self.verdict_meanings.get(verdict, f"Unknown verdict: {verdict}")
+                    
+                    return {
+                        "success": True,
+                        "verdict": verdict,
+                        "meaning": meaning,
+                        "method": "alternative_check",
+                        "elapsed_seconds": elapsed,
+                        "polls": poll_count,
+                        "timestamp": datetime.now().isoformat()
+                    }
             except Exception as e:
-                logger.debug(f"Alternative method 1 failed: {e}")
+                logger.debug("Alternative method 1 failed: %s", e)
             
             # Method 2: For now, return a pending status if we can't determine the verdict
             console.print(f"  [yellow]⏳ Verdict check inconclusive after {elapsed:.1f}s[/yellow]")
@@ -159,7 +331,7 @@ class VerdictManager:
             }
             
         except Exception as e:
-            logger.error(f"Alternative verdict check failed: {e}")
+            logger.error("Alternative verdict check failed: %s", e)
             return {
                 "success": False,
                 "error": f"All verdict checking methods failed: {e}",
@@ -167,27 +339,32 @@ class VerdictManager:
                 "polls": poll_count
             }
     
+    def _get_submissions_index(self) -> Dict[str, Any]:
+        """Get all submissions by ID, refetching the list at most every SUBMISSIONS_INDEX_TTL seconds"""
+        with self._submissions_index_lock:
+            if self._submissions_index is None or time.monotonic() - self._submissions_index_time > SUBMISSIONS_INDEX_TTL:
+                self._submissions_index = {
+                    submission.submission_id: submission
+                    for submission in self.client.student.submissions.get_all()
+                    if hasattr(submission, 'submission_id')
+                }
+                self._submissions_index_time = time.monotonic()
+            return self._submissions_index
+    
     def _extract_submission_details(self, state) -> Dict[str, Any]:
         """
         Extract additional details from the submission state
         """
-        details = {}
-        
         try:
             # Extract any available details from the state object
-            if hasattr(state, 'execution_time'):
-                details['execution_time'] = state.execution_time
-            if hasattr(state, 'memory_usage'):
-                details['memory_usage'] = state.memory_usage
-            if hasattr(state, 'score'):
-                details['score'] = state.score
-            if hasattr(state, 'compiler_output'):
-                details['compiler_output'] = state.compiler_output
-                
+            return {
+                name: value for name in SUBMISSION_DETAIL_ATTRS
+                if (value := getattr(state, name, _MISSING)) is not _MISSING
+            }
         except Exception as e:
-            logger.debug(f"Could not extract submission details: {e}")
-        
-        return details
+            # getattr only absorbs AttributeError; an API state object may raise anything else
+            logger.debug("Could not extract submission details: %s", e)
+            return {}
     
     def interpret_verdict(self, verdict: str) -> Dict[str, Any]:
         """
@@ -199,50 +376,13 @@ class VerdictManager:
         Returns:
             Dict with interpretation details
         """
-        interpretation = {
+        return {
             "verdict": verdict,
             "meaning": self.verdict_meanings.get(verdict, "Unknown"),
             "success": verdict in self.accepted_verdicts,
-            "should_retry": verdict in ["CE", "RE", "IE"],  # Errors that might be fixable
-            "is_timeout": verdict in ["TLE"],
-            "is_memory_issue": verdict in ["MLE", "OLE"],
-            "is_logic_error": verdict in ["WA", "PE"]
-        }
-        
-        # Add suggestions based on verdict type
-        suggestions = []
-        
-        if verdict == "WA":
-            suggestions.extend([
-                "Check edge cases and boundary conditions",
-                "Verify input/output format matches exactly",
-                "Review algorithm logic"
-            ])
-        elif verdict == "TLE":
-            suggestions.extend([
-                "Optimize algorithm complexity",
-                "Use more efficient data structures",
-                "Check for infinite loops"
-            ])
-        elif verdict == "CE":
-            suggestions.extend([
-                "Check syntax errors",
-                "Verify all imports and includes",
-                "Ensure proper language syntax"
-            ])
-        elif verdict == "RE":
-            suggestions.extend([
-                "Check for array bounds errors",
-                "Handle division by zero",
-                "Verify input parsing"
-            ])
-        elif verdict == "MLE":
-            suggestions.extend([
-                "Reduce memory usage",
-                "Use more efficient data structures",
-                "Check for memory leaks"
-            ])
-        
-        interpretation["suggestions"] = suggestions
-        
-        return interpretation
\ No newline at end of file
+            "should_retry": verdict in RETRYABLE_VERDICTS,
+            "is_timeout": verdict == "TLE",
+            "is_memory_issue": verdict in MEMORY_VERDICTS,
+            "is_logic_error": verdict in LOGIC_ERROR_VERDICTS,
+            "suggestions": list(VERDICT_SUGGESTIONS.get(verdict, ()))
+        }
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Persistent history of how long Jutge takes to judge submissions, used to place verdict polls
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Observations needed before a history is trusted, and how many are kept per key
+MIN_SAMPLES = 5
+MAX_SAMPLES = 200
+
+# Polls placed from a history: each one covers the same share of the observed verdict times
+SCHEDULE_POLLS = 8
+
+
+class VerdictTimingStats:
+    """JSON-backed verdict times per (problem, compiler) and per compiler"""
+    
+    def __init__(self, path: str):
+        """
+        Load the history (a missing or unreadable file starts an empty one)
+        
+        Args:
+            path: JSON file path ("~" is expanded)
+        """
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._times: Dict[str, List[float]] = {}
+        
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._times = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Could not load verdict times from %s: %s", self.path, e)
+    
+    def record(self, problem_id: str, compiler_id: Optional[str], elapsed: float) -> None:
+        """Add the time a submission took to get its verdict and save the history"""
+        with self._lock:
+            for key in self._keys(problem_id, compiler_id):
+                samples = self._times.setdefault(key, [])
+                samples.append(round(elapsed, 3))
+                del samples[:-MAX_SAMPLES]
+            
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(self._times, f)
+            except OSError as e:
+                # The history is only an optimization: polling falls back to backoff without it
+                logger.warning("Could not save verdict times to %s: %s", self.path, e)
+    
+    def poll_schedule(self, problem_id: str, compiler_id: Optional[str]) -> List[float]:
+        """
+        Get the times (seconds after submitting) at which to poll, or [] without enough history
+        
+        The times are quantiles of the observed verdict times, so each poll has the same chance
+        of finding the verdict. The problem's own history is used when there is enough of it,
+        otherwise the compiler's.
+        """
+        with self._lock:
+            for key in self._keys(problem_id, compiler_id):
+                samples = sorted(self._times.get(key, []))
+                if len(samples) >= MIN_SAMPLES:
+                    break
+            else:
+                return []
+        
+        count = len(samples)
+        polls = min(SCHEDULE_POLLS, count)
+        return sorted({samples[math.ceil(i * count / polls) - 1] for i in range(1, polls + 1)})
+    
+    def _keys(self, problem_id: str, compiler_id: Optional[str]) -> List[str]:
+        """History keys for a submission, most specific first"""
+        keys = [f"{problem_id}:{compiler_id}"]
+        if compiler_id:
+            keys.append(compiler_id)
+        return keys
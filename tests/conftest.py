@@ -0,0 +1,106 @@
+"""
+Fixtures shared by the unit and integration tests
+"""
+
+import base64
+from functools import lru_cache
+from unittest.mock import Mock
+
+import pytest
+
+from jutge_solver.solution_generator import SolutionGenerator
+
+
+# OpenAI config fields the generator reads, as most tests set them
+OPENAI_CONFIG_DEFAULTS = {
+    "model": "gpt-4",
+    "formatter_model": None,
+    "max_tokens": 1000,
+    "temperature": 0.1,
+    "timeout": 30,
+}
+
+
+@lru_cache(maxsize=None)
+def _b64(text: str) -> str:
+    """Base64 of a testcase text, encoded once per distinct text"""
+    return base64.b64encode(text.encode()).decode()
+
+
+def _testcases(prefix: str, cases) -> list:
+    """Testcase dicts, as served by the API, for (input, output) pairs"""
+    return [
+        {"name": f"{prefix}{i}", "input_b64": _b64(input_data), "correct_b64": _b64(output)}
+        for i, (input_data, output) in enumerate(cases, 1)
+    ]
+
+
+@pytest.fixture(scope="session")
+def solution_generator():
+    """
+    Solution generator without a client, for the tests of its extraction, validation and formatting helpers
+    
+    The generator memoizes rendered statements and decoded testcases per problem_info, keyed by
+    id(problem_info). Each memo holds its dict and is checked by identity, so tests stay isolated
+    as long as they build a fresh problem_info (e.g. with make_problem_info) instead of reusing one.
+    """
+    return SolutionGenerator(None, None)
+
+
+@pytest.fixture(scope="session")
+def make_problem_info():
+    """
+    Factory of problem_info dicts like the analyzer's, with testcases given as (input, output) pairs
+    
+    Testcase lists are only included when given, so tests can tell missing lists from empty ones.
+    """
+    def make(title="Sum Problem", author="Test Author", statement="<p>Add two numbers</p>",
+             sample=None, public=None) -> dict:
+        problem_info = {"title": title, "author": author, "statement": statement}
+        if sample is not None:
+            problem_info["sample_testcases"] = _testcases("sample", sample)
+        if public is not None:
+            problem_info["public_testcases"] = _testcases("public", public)
+        return problem_info
+    
+    return make
+
+
+@pytest.fixture(scope="session")
+def make_completion():
+    """Factory of mock chat completions with the given content and token usage"""
+    def make(content: str, prompt_tokens: int = 10, completion_tokens: int = 20) -> Mock:
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message.content = content
+        response.usage = Mock(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens)
+        return response
+    
+    return make
+
+
+@pytest.fixture(scope="session")
+def make_openai_client(make_completion):
+    """Factory of mock OpenAI clients whose chat completion calls return the given contents in order"""
+    def make(*contents: str) -> Mock:
+        client = Mock()
+        client.chat.completions.create.side_effect = [make_completion(content) for content in contents]
+        return client
+    
+    return make
+
+
+@pytest.fixture(scope="session")
+def mock_openai_config():
+    """
+    Factory of OpenAI config mocks with OPENAI_CONFIG_DEFAULTS, overridden by the given fields
+    
+    Fields left unset read as Mock attributes, which the generator treats as disabled options.
+    """
+    def make(**fields) -> Mock:
+        config = Mock()
+        config.configure_mock(**{**OPENAI_CONFIG_DEFAULTS, **fields})
+        return config
+    
+    return make
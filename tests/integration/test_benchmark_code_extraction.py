@@ -5,6 +5,7 @@ Integration tests for benchmark code extraction functionality
 import pytest
 import sys
 import os
+from types import SimpleNamespace
 from unittest.mock import Mock, MagicMock, patch
 
 # Add parent directory to path for imports
@@ -14,123 +15,121 @@ from jutge_solver.benchmark import AIModelAdapter
 from jutge_solver.benchmark_config import AIModelConfig
 
 
+# Exact responses from the benchmark results, by model
+MODEL_RESPONSES = {
+    "Gemini-2.5-Pro": '```python\nprint("Hello world!")\n```',
+    "DeepSeek": '```python\nprint("Hello world!")\n```',
+    "Gemini-2.5-Flash": 'print("Hello world!")',
+    "Claude-Sonnet": 'print("Hello world!")'
+}
+
+# Responses that caused issues in benchmark
+MARKDOWN_CASES = [
+    {
+        "input": '```python\nprint("Hello world!")\n```',
+        "expected": 'print("Hello world!")',
+        "description": "Markdown with actual newlines (Gemini/DeepSeek issue)"
+    },
+    {
+        "input": '```python\\nprint("Hello world!")\\n```',
+        "expected": 'print("Hello world!")',
+        "description": "Markdown with escaped newlines"
+    },
+    {
+        "input": 'print("Hello world!")',
+        "expected": 'print("Hello world!")',
+        "description": "Clean code without markdown"
+    }
+]
+
+
+def make_adapter(provider: str, name: str = None) -> AIModelAdapter:
+    """Create an adapter for a provider with a mocked client"""
+    config = AIModelConfig(
+        name=name or f"test-{provider}",
+        provider=provider,
+        model_id="test-model",
+        api_key="test-key"
+    )
+    
+    with patch.object(AIModelAdapter, '_create_client', return_value=Mock()):
+        return AIModelAdapter(config)
+
+
+@pytest.fixture(scope="class", params=["openai", "anthropic", "google", "openrouter"])
+def adapter(request):
+    """One adapter per provider, shared by the extraction cases"""
+    return make_adapter(request.param), request.param
+
+
 class TestBenchmarkCodeExtraction:
     """Test that benchmark properly extracts code from AI model responses"""
     
+    # Response objects by provider, shaped like the fields the adapter reads
+    RESPONSE_BUILDERS = {
+        "openai": lambda content: SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(total_tokens=100)
+        ),
+        "openrouter": lambda content: SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(total_tokens=100)
+        ),
+        "anthropic": lambda content: SimpleNamespace(
+            content=[SimpleNamespace(text=content)],
+            usage=SimpleNamespace(input_tokens=50, output_tokens=50)
+        ),
+        "google": lambda content: SimpleNamespace(text=content),
+    }
+    
     def create_mock_response(self, content: str, provider: str):
         """Create a mock response object based on provider"""
+        return self.RESPONSE_BUILDERS[provider](content)
+    
+    def set_response(self, adapter: AIModelAdapter, provider: str, content: str):
+        """Make the adapter's mocked client return a response with the given content"""
+        mock_response = self.create_mock_response(content, provider)
+        
         if provider in {"openai", "openrouter"}:
-            mock_response = Mock()
-            mock_response.choices = [Mock()]
-            mock_response.choices[0].message = Mock()
-            mock_response.choices[0].message.content = content
-            mock_response.usage = Mock()
-            mock_response.usage.total_tokens = 100
-            return mock_response
+            adapter.client.chat.completions.create.return_value = mock_response
         elif provider == "anthropic":
-            mock_response = Mock()
-            mock_response.content = [Mock()]
-            mock_response.content[0].text = content
-            mock_response.usage = Mock()
-            mock_response.usage.input_tokens = 50
-            mock_response.usage.output_tokens = 50
-            return mock_response
+            adapter.client.messages.create.return_value = mock_response
         elif provider == "google":
-            mock_response = Mock()
-            mock_response.text = content
-            return mock_response
+            adapter.client.generate_content.return_value = mock_response
     
-    @pytest.mark.parametrize("provider", ["openai", "anthropic", "google", "openrouter"])
-    def test_markdown_extraction(self, provider):
+    @pytest.mark.parametrize("case", MARKDOWN_CASES, ids=lambda case: case["description"])
+    def test_markdown_extraction(self, adapter, case):
         """Test extraction from markdown-wrapped responses"""
-        # Create config
-        config = AIModelConfig(
-            name=f"test-{provider}",
-            provider=provider,
-            model_id="test-model",
-            api_key="test-key"
-        )
+        adapter, provider = adapter
+        self.set_response(adapter, provider, case["input"])
         
-        # Create adapter with mocked client
-        with patch.object(AIModelAdapter, '_create_client', return_value=Mock()):
-            adapter = AIModelAdapter(config)
+        # Generate solution
+        problem_data = {
+            "title": "Test Problem",
+            "statement": "Print hello world",
+            "input": "",
+            "output": "Hello world!",
+            "samples": []
+        }
         
-        # Test responses that caused issues in benchmark
-        test_cases = [
-            {
-                "input": '```python\nprint("Hello world!")\n```',
-                "expected": 'print("Hello world!")',
-                "description": "Markdown with actual newlines (Gemini/DeepSeek issue)"
-            },
-            {
-                "input": '```python\\nprint("Hello world!")\\n```',
-                "expected": 'print("Hello world!")',
-                "description": "Markdown with escaped newlines"
-            },
-            {
-                "input": 'print("Hello world!")',
-                "expected": 'print("Hello world!")',
-                "description": "Clean code without markdown"
-            }
-        ]
+        solution, tokens, time = adapter.generate_solution(problem_data, "Python3")
         
-        for case in test_cases:
-            # Mock the API response
-            mock_response = self.create_mock_response(case["input"], provider)
-            
-            if provider in {"openai", "openrouter"}:
-                adapter.client.chat.completions.create.return_value = mock_response
-            elif provider == "anthropic":
-                adapter.client.messages.create.return_value = mock_response
-            elif provider == "google":
-                adapter.client.generate_content.return_value = mock_response
-            
-            # Generate solution
-            problem_data = {
-                "title": "Test Problem",
-                "statement": "Print hello world",
-                "input": "",
-                "output": "Hello world!",
-                "samples": []
-            }
-            
-            solution, tokens, time = adapter.generate_solution(problem_data, "Python3")
-            
-            # Verify the code was properly extracted
-            assert solution == case["expected"], f"Failed for {provider} with {case['description']}"
+        # Verify the code was properly extracted
+        assert solution == case["expected"], f"Failed for {provider} with {case['description']}"
     
-    def test_real_world_responses(self):
+    @pytest.mark.parametrize("model_name,response", MODEL_RESPONSES.items())
+    def test_real_world_responses(self, model_name, response):
         """Test with actual response patterns from different models"""
-        # Simulate exact responses from the benchmark results
-        model_responses = {
-            "Gemini-2.5-Pro": '```python\nprint("Hello world!")\n```',
-            "DeepSeek": '```python\nprint("Hello world!")\n```',
-            "Gemini-2.5-Flash": 'print("Hello world!")',
-            "Claude-Sonnet": 'print("Hello world!")'
-        }
+        # Use openai provider for testing
+        adapter = make_adapter("openai", model_name)
+        self.set_response(adapter, "openai", response)
         
-        for model_name, response in model_responses.items():
-            # Use openai provider for testing
-            config = AIModelConfig(
-                name=model_name,
-                provider="openai",
-                model_id="test-model",
-                api_key="test-key"
-            )
-            
-            with patch.object(AIModelAdapter, '_create_client', return_value=Mock()):
-                adapter = AIModelAdapter(config)
-            
-            # Mock response
-            mock_response = self.create_mock_response(response, "openai")
-            adapter.client.chat.completions.create.return_value = mock_response
-            
-            # Generate solution
-            problem_data = {"title": "Test", "statement": "Test", "samples": []}
-            solution, _, _ = adapter.generate_solution(problem_data, "Python3")
-            
-            # All should extract to clean code
-            assert solution == 'print("Hello world!")', f"Failed for {model_name}"
+        # Generate solution
+        problem_data = {"title": "Test", "statement": "Test", "samples": []}
+        solution, _, _ = adapter.generate_solution(problem_data, "Python3")
+        
+        # All should extract to clean code
+        assert solution == 'print("Hello world!")', f"Failed for {model_name}"
 
 
 if __name__ == "__main__":
@@ -142,7 +141,9 @@ if __name__ == "__main__":
     # Test each provider
     for provider in ["openai", "anthropic", "google", "openrouter"]:
         try:
-            test.test_markdown_extraction(provider)
+            provider_adapter = make_adapter(provider)
+            for case in MARKDOWN_CASES:
+                test.test_markdown_extraction((provider_adapter, provider), case)
             print(f"✓ {provider} extraction tests passed")
         except AssertionError as e:
             print(f"✗ {provider} extraction tests failed: {e}")
@@ -151,11 +152,12 @@ if __name__ == "__main__":
     
     # Test real-world responses
     try:
-        test.test_real_world_responses()
+        for model_name, response in MODEL_RESPONSES.items():
+            test.test_real_world_responses(model_name, response)
         print("✓ Real-world response tests passed")
     except AssertionError as e:
         print(f"✗ Real-world response tests failed: {e}")
     except Exception as e:
         print(f"✗ Real-world tests error: {e}")
     
-    print("\nAll tests completed!") 
\ No newline at end of file
+    print("\nAll tests completed!")
\ No newline at end of file
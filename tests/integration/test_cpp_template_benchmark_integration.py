@@ -4,33 +4,32 @@ Test script to validate C++ template enforcement integration with the benchmark
 """
 
 import sys
-import os
+from types import SimpleNamespace
 from unittest.mock import Mock, MagicMock
 
-# Add the parent directory to the path so we can import the modules
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pytest
 
 from jutge_solver.solution_generator import SolutionGenerator
 
-def test_solution_generation_with_template_validation():
-    """Test that solution generation includes template validation for C++"""
-    
-    print("Testing C++ Solution Generation with Template Validation...")
-    print("=" * 60)
-    
-    # Mock OpenAI client and config
-    mock_client = Mock()
-    mock_config = Mock()
-    mock_config.model = "gpt-4"
-    mock_config.max_tokens = 1000
-    mock_config.temperature = 0.3
-    mock_config.timeout = 30
+def make_chat_response(content: str, prompt_tokens: int, completion_tokens: int) -> SimpleNamespace:
+    """Build an object shaped like an OpenAI chat completion"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            total_tokens=prompt_tokens + completion_tokens,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens
+        )
+    )
+
+class FakeOpenAIClient:
+    """OpenAI client stand-in with only the chat completions endpoint the generator calls"""
     
-    # Create mock responses for the two-step process
-    # Step 1 response (analysis + initial code)
-    step1_response = Mock()
-    step1_response.choices = [Mock()]
-    step1_response.choices[0].message.content = """
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=MagicMock()))
+
+# Step 1 response (analysis + initial code)
+STEP1_RESPONSE = make_chat_response("""
 Here's my analysis and solution:
 
 The problem asks to sum two integers.
@@ -53,16 +52,10 @@ int main() {
     return 0;
 }
 ```
-"""
-    step1_response.usage = Mock()
-    step1_response.usage.total_tokens = 150
-    step1_response.usage.prompt_tokens = 50
-    step1_response.usage.completion_tokens = 100
-    
-    # Step 2 response (formatted code) - this should be clean code without markdown
-    step2_response = Mock()
-    step2_response.choices = [Mock()]
-    step2_response.choices[0].message.content = """#include <iostream>
+""", 50, 100)
+
+# Step 2 response (formatted code) - this should be clean code without markdown
+VALID_STEP2_RESPONSE = make_chat_response("""#include <iostream>
 using namespace std;
 
 int main() {
@@ -77,14 +70,44 @@ int main() {
     cout << sum << endl;
     
     return 0;
-}"""
-    step2_response.usage = Mock()
-    step2_response.usage.total_tokens = 120
-    step2_response.usage.prompt_tokens = 80
-    step2_response.usage.completion_tokens = 40
+}""", 80, 40)
+
+# Step 2 response that breaks the C++ template
+INVALID_STEP2_RESPONSE = make_chat_response("""void solve() {
+    int a, b;
+    scanf("%d %d", &a, &b);
+    printf("%d\\n", a + b);
+}""", 60, 20)
+
+# Python code should not be affected by the C++ template validation
+PYTHON_STEP2_RESPONSE = make_chat_response("""a, b = map(int, input().split())
+print(a + b)""", 30, 20)
+
+# (step 2 response, compiler, attempt, expected success) for each generation case
+GENERATION_CASES = [
+    (VALID_STEP2_RESPONSE, "G++17", 1, True),
+    (INVALID_STEP2_RESPONSE, "G++17", 2, False),
+    (PYTHON_STEP2_RESPONSE, "Python3", 1, True),
+]
+
+@pytest.mark.parametrize("step2_response,compiler_id,attempt,expected_success", GENERATION_CASES,
+                         ids=["valid-cpp", "invalid-cpp", "python"])
+def test_solution_generation_with_template_validation(step2_response, compiler_id, attempt, expected_success):
+    """Test that solution generation includes template validation for C++"""
     
-    # Configure mock client to return these responses
-    mock_client.chat.completions.create.side_effect = [step1_response, step2_response]
+    print(f"Testing {compiler_id} Solution Generation with Template Validation...")
+    print("-" * 40)
+    
+    # Mock OpenAI client and config
+    mock_client = FakeOpenAIClient()
+    mock_config = Mock()
+    mock_config.model = "gpt-4"
+    mock_config.max_tokens = 1000
+    mock_config.temperature = 0.3
+    mock_config.timeout = 30
+    
+    # Configure mock client to return the two-step responses
+    mock_client.chat.completions.create.side_effect = [STEP1_RESPONSE, step2_response]
     
     # Create solution generator
     generator = SolutionGenerator(mock_client, mock_config)
@@ -97,82 +120,31 @@ int main() {
         "sample_testcases": []
     }
     
-    print("Test 1: Valid C++ template should pass")
-    print("-" * 40)
-    
     # Generate solution
-    result = generator.generate_solution(problem_info, "G++17", 1)
+    result = generator.generate_solution(problem_info, compiler_id, attempt)
     
     print(f"Success: {result.get('success')}")
-    print(f"Code generated: {len(result.get('code', '')) > 0}")
-    print(f"Token usage: {result.get('token_usage', {}).get('total_tokens', 0)}")
+    print(f"Error: {result.get('error', 'No error')}")
+    
+    if not expected_success:
+        assert result["success"] == False, "Solution generation should fail for invalid template"
+        assert "template structure" in result.get("error", "").lower(), "Error should mention template structure"
+        print("✓ Invalid template test passed")
+        return
     
     if not result.get('success'):
-        print(f"Error: {result.get('error')}")
         print("Extracted code:")
         print(repr(result.get('code', 'No code')))
     
-    assert result["success"] == True, "Solution generation should succeed for valid template"
-    assert "#include <iostream>" in result["code"], "Generated code should include iostream"
-    assert "using namespace std;" in result["code"], "Generated code should include using namespace"
-    assert "int main(" in result["code"], "Generated code should include main function"
-    assert "return 0;" in result["code"], "Generated code should include return 0"
-    
-    print("✓ Valid template test passed")
-    
-    print("\nTest 2: Invalid C++ template should fail")
-    print("-" * 40)
-    
-    # Create invalid response for step 2
-    invalid_step2_response = Mock()
-    invalid_step2_response.choices = [Mock()]
-    invalid_step2_response.choices[0].message.content = """void solve() {
-    int a, b;
-    scanf("%d %d", &a, &b);
-    printf("%d\\n", a + b);
-}"""
-    invalid_step2_response.usage = Mock()
-    invalid_step2_response.usage.total_tokens = 80
-    invalid_step2_response.usage.prompt_tokens = 60
-    invalid_step2_response.usage.completion_tokens = 20
-    
-    # Configure mock to return invalid response on second call
-    mock_client.chat.completions.create.side_effect = [step1_response, invalid_step2_response]
-    
-    # Generate solution (should fail due to template validation)
-    result = generator.generate_solution(problem_info, "G++17", 2)
-    
-    print(f"Success: {result.get('success')}")
-    print(f"Error: {result.get('error', 'No error')}")
-    
-    assert result["success"] == False, "Solution generation should fail for invalid template"
-    assert "template structure" in result.get("error", "").lower(), "Error should mention template structure"
-    
-    print("✓ Invalid template test passed")
-    
-    print("\nTest 3: Python code should not be affected")
-    print("-" * 40)
-    
-    # Test that Python code generation is not affected by C++ template validation
-    python_response = Mock()
-    python_response.choices = [Mock()]
-    python_response.choices[0].message.content = """a, b = map(int, input().split())
-print(a + b)"""
-    python_response.usage = Mock()
-    python_response.usage.total_tokens = 50
-    python_response.usage.prompt_tokens = 30
-    python_response.usage.completion_tokens = 20
-    
-    mock_client.chat.completions.create.side_effect = [step1_response, python_response]
-    
-    result = generator.generate_solution(problem_info, "Python3", 1)
-    
-    print(f"Success: {result.get('success')}")
-    print(f"Code: {result.get('code', 'No code')}")
+    assert result["success"] == True, f"{compiler_id} solution generation should succeed"
     
-    assert result["success"] == True, "Python solution generation should not be affected"
+    if compiler_id == "G++17":
+        assert "#include <iostream>" in result["code"], "Generated code should include iostream"
+        assert "using namespace std;" in result["code"], "Generated code should include using namespace"
+        assert "int main(" in result["code"], "Generated code should include main function"
+        assert "return 0;" in result["code"], "Generated code should include return 0"
     
-    print("✓ Python test passed")
+    print("✓ Valid solution test passed")
 
 def test_benchmark_integration():
     """Test that the AIModelAdapter in benchmark.py would work with template validation"""
@@ -212,7 +184,8 @@ def test_benchmark_integration():
 
 if __name__ == "__main__":
     try:
-        test_solution_generation_with_template_validation()
+        for case in GENERATION_CASES:
+            test_solution_generation_with_template_validation(*case)
         test_benchmark_integration()
         print("\n🎉 All integration tests completed successfully!")
         print("The C++ template enforcement is properly integrated with the benchmark system.")
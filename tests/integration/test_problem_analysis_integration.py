@@ -4,101 +4,111 @@ Integration tests for the complete problem analysis and statement formatting flo
 
 import pytest
 import base64
+import re
+from types import SimpleNamespace
 from unittest.mock import Mock, MagicMock
-import sys
-import os
-
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
 
 from jutge_solver.problem_analyzer import ProblemAnalyzer
-from jutge_solver.solution_generator import SolutionGenerator
 
 
-class TestProblemAnalysisIntegration:
-    """Integration tests for problem analysis to solution generation flow"""
+def make_testcase(name: str, input_data: bytes, correct: bytes) -> dict:
+    """Build a testcase dict with base64-encoded input and output, as the API returns them"""
+    return {
+        "name": name,
+        "input_b64": base64.b64encode(input_data).decode("ascii"),
+        "correct_b64": base64.b64encode(correct).decode("ascii")
+    }
+
+
+# Testcases served by the mock client, encoded once for all tests
+SAMPLE_TESTCASES = [
+    make_testcase("sample1", b"1 2", b"3"),
+    make_testcase("sample2", b"5 7", b"12")
+]
+
+# Public testcases (includes samples + additional)
+PUBLIC_TESTCASES = SAMPLE_TESTCASES + [
+    make_testcase("public1", b"10 20", b"30"),
+    make_testcase("public2", b"100 200", b"300"),
+    make_testcase("edge1", b"1000 1000", b"2000")
+]
+
+# Statement of the mocked problem
+STATEMENT_HTML = """
+<div>
+    <p>Given two integers A and B, compute their sum.</p>
+    <h3>Input</h3>
+    <p>Two integers A and B (1 ≤ A, B ≤ 1000)</p>
+    <h3>Output</h3>
+    <p>Print the sum A + B</p>
+</div>
+"""
+
+# Fields of an analysis that statement generation needs
+STATEMENT_FIELDS = frozenset({
+    "title", "author", "statement", "abstract_problem",
+    "sample_testcases", "public_testcases"
+})
+
+
+# Text the formatted statement of the mocked problem must contain
+STATEMENT_TEXTS = (
+    "Title: Sum of Two Integers",
+    "Author: Programming Contest Committee",
+    "Problem Statement:",
+    "Given two integers A and B, compute their sum.",
+    "Sample Test Cases:",
+    "Test Case 1:", "Input: 1 2", "Expected Output: 3",
+    "Test Case 2:", "Input: 5 7", "Expected Output: 12",
+    "Additional Public Test Cases:",
+    "Test Case 3:", "Input: 10 20", "Expected Output: 30",
+    "Test Case 4:", "Input: 100 200", "Expected Output: 300",
+    "Test Case 5:", "Input: 1000 1000", "Expected Output: 2000"
+)
+
+# All of them in one alternation, longest first so "Expected Output: 3" does not shadow "Expected Output: 30"
+STATEMENT_PATTERN = re.compile("|".join(map(re.escape, sorted(STATEMENT_TEXTS, key=len, reverse=True))))
+
+
+def make_jutge_client() -> Mock:
+    """Create a comprehensive mock Jutge API client"""
+    client = Mock()
+    
+    # Abstract problem and problem rich data (plain data: only the client needs call tracking)
+    mock_abstract_problem = SimpleNamespace(
+        author="Programming Contest Committee",
+        problem_nm="SUM001",
+        created_at="2024-01-01 12:00:00",
+        type="basic"
+    )
     
-    @pytest.fixture
-    def mock_jutge_client(self):
-        """Create a comprehensive mock Jutge API client"""
-        client = Mock()
-        
-        # Mock abstract problem
-        mock_abstract_problem = Mock()
-        mock_abstract_problem.author = "Programming Contest Committee"
-        mock_abstract_problem.problem_nm = "SUM001"
-        mock_abstract_problem.created_at = "2024-01-01 12:00:00"
-        mock_abstract_problem.type = "basic"
-        
-        # Mock problem rich data
-        mock_problem_rich = Mock()
-        mock_problem_rich.title = "Sum of Two Integers"
-        mock_problem_rich.html_statement = """
-        <div>
-            <p>Given two integers A and B, compute their sum.</p>
-            <h3>Input</h3>
-            <p>Two integers A and B (1 ≤ A, B ≤ 1000)</p>
-            <h3>Output</h3>
-            <p>Print the sum A + B</p>
-        </div>
-        """
-        mock_problem_rich.abstract_problem = mock_abstract_problem
-        mock_problem_rich.sample_testcases = [
-            {
-                "name": "sample1",
-                "input_b64": base64.b64encode("1 2".encode()).decode(),
-                "correct_b64": base64.b64encode("3".encode()).decode()
-            },
-            {
-                "name": "sample2",
-                "input_b64": base64.b64encode("5 7".encode()).decode(),
-                "correct_b64": base64.b64encode("12".encode()).decode()
-            }
-        ]
-        
-        # Mock public testcases (includes samples + additional)
-        mock_public_testcases = [
-            {
-                "name": "sample1",
-                "input_b64": base64.b64encode("1 2".encode()).decode(),
-                "correct_b64": base64.b64encode("3".encode()).decode()
-            },
-            {
-                "name": "sample2", 
-                "input_b64": base64.b64encode("5 7".encode()).decode(),
-                "correct_b64": base64.b64encode("12".encode()).decode()
-            },
-            {
-                "name": "public1",
-                "input_b64": base64.b64encode("10 20".encode()).decode(),
-                "correct_b64": base64.b64encode("30".encode()).decode()
-            },
-            {
-                "name": "public2",
-                "input_b64": base64.b64encode("100 200".encode()).decode(),
-                "correct_b64": base64.b64encode("300".encode()).decode()
-            },
-            {
-                "name": "edge1",
-                "input_b64": base64.b64encode("1000 1000".encode()).decode(),
-                "correct_b64": base64.b64encode("2000".encode()).decode()
-            }
-        ]
-        
-        client.problems.get_problem_rich.return_value = mock_problem_rich
-        client.problems.get_public_testcases.return_value = mock_public_testcases
-        
-        return client
+    mock_problem_rich = SimpleNamespace(
+        title="Sum of Two Integers",
+        html_statement=STATEMENT_HTML,
+        abstract_problem=mock_abstract_problem,
+        sample_testcases=SAMPLE_TESTCASES
+    )
     
-    @pytest.fixture 
-    def problem_analyzer(self, mock_jutge_client):
-        """Create problem analyzer with mocked client"""
-        return ProblemAnalyzer(mock_jutge_client)
-        
-    @pytest.fixture
-    def solution_generator(self):
-        """Create solution generator for testing"""
-        return SolutionGenerator(None, Mock())
+    client.problems.get_problem_rich.return_value = mock_problem_rich
+    client.problems.get_public_testcases.return_value = PUBLIC_TESTCASES
+    
+    return client
+
+
+@pytest.fixture(scope="module")
+def mock_jutge_client():
+    """Mock client shared by the tests of the module (tests that need their own build one)"""
+    return make_jutge_client()
+
+
+@pytest.fixture(scope="module")
+def problem_analyzer(mock_jutge_client):
+    """Create problem analyzer with mocked client"""
+    return ProblemAnalyzer(mock_jutge_client)
+
+
+class TestProblemAnalysisIntegration:
+    """Integration tests for problem analysis to solution generation flow"""
     
     def test_complete_problem_analysis_to_statement_flow(self, problem_analyzer, solution_generator):
         """Test the complete flow from problem analysis to formatted statement"""
@@ -115,32 +125,10 @@ class TestProblemAnalysisIntegration:
         # Step 2: Generate formatted problem statement
         formatted_statement = solution_generator._get_problem_statement(problem_info)
         
-        # Verify comprehensive formatting
-        assert "Title: Sum of Two Integers" in formatted_statement
-        assert "Author: Programming Contest Committee" in formatted_statement
-        assert "Problem Statement:" in formatted_statement
-        assert "Given two integers A and B, compute their sum." in formatted_statement
-        
-        # Verify sample test cases are included
-        assert "Sample Test Cases:" in formatted_statement
-        assert "Test Case 1:" in formatted_statement
-        assert "Input: 1 2" in formatted_statement
-        assert "Expected Output: 3" in formatted_statement
-        assert "Test Case 2:" in formatted_statement
-        assert "Input: 5 7" in formatted_statement
-        assert "Expected Output: 12" in formatted_statement
-        
-        # Verify additional public test cases are included
-        assert "Additional Public Test Cases:" in formatted_statement
-        assert "Test Case 3:" in formatted_statement
-        assert "Input: 10 20" in formatted_statement
-        assert "Expected Output: 30" in formatted_statement
-        assert "Test Case 4:" in formatted_statement
-        assert "Input: 100 200" in formatted_statement
-        assert "Expected Output: 300" in formatted_statement
-        assert "Test Case 5:" in formatted_statement
-        assert "Input: 1000 1000" in formatted_statement
-        assert "Expected Output: 2000" in formatted_statement
+        # Verify comprehensive formatting, sample and additional public test cases in one scan
+        found = set(STATEMENT_PATTERN.findall(formatted_statement))
+        missing = [text for text in STATEMENT_TEXTS if text not in found]
+        assert not missing, f"Missing from the formatted statement: {missing}"
         
     def test_problem_analysis_preserves_all_data_for_statement(self, problem_analyzer, solution_generator):
         """Test that all necessary data is preserved through the analysis pipeline"""
@@ -148,13 +136,8 @@ class TestProblemAnalysisIntegration:
         problem_info = problem_analyzer.analyze_problem("P12345_en")
         
         # Verify all required fields for statement generation are present
-        required_fields = [
-            "title", "author", "statement", "abstract_problem", 
-            "sample_testcases", "public_testcases"
-        ]
-        
-        for field in required_fields:
-            assert field in problem_info, f"Missing required field: {field}"
+        missing = STATEMENT_FIELDS - problem_info.keys()
+        assert not missing, f"Missing required fields: {missing}"
             
         # Verify abstract problem structure
         assert problem_info["abstract_problem"].author == "Programming Contest Committee"
@@ -201,25 +184,30 @@ class TestProblemAnalysisIntegration:
         assert "Sample Test Cases:" in samples_statement
         assert "Additional Public Test Cases:" not in samples_statement
         
-    def test_api_integration_calls(self, mock_jutge_client, problem_analyzer):
+    def test_api_integration_calls(self):
         """Test that the correct API methods are called in the right sequence"""
-        problem_analyzer.analyze_problem("P12345_en")
+        # A client of its own, recording the order of the calls as they are made
+        client = make_jutge_client()
+        problem_rich = client.problems.get_problem_rich.return_value
+        order = []
+        client.problems.get_problem_rich.side_effect = lambda problem_id: order.append("get_problem_rich") or problem_rich
+        client.problems.get_public_testcases.side_effect = lambda problem_id: order.append("get_public_testcases") or PUBLIC_TESTCASES
+        
+        ProblemAnalyzer(client).analyze_problem("P12345_en")
         
         # Verify API calls were made
-        mock_jutge_client.problems.get_problem_rich.assert_called_once_with("P12345_en")
-        mock_jutge_client.problems.get_public_testcases.assert_called_once_with("P12345_en")
+        client.problems.get_problem_rich.assert_called_once_with("P12345_en")
+        client.problems.get_public_testcases.assert_called_once_with("P12345_en")
         
         # Verify call order (get_problem_rich should be called first)
-        calls = mock_jutge_client.problems.method_calls
-        assert len(calls) == 2
-        assert calls[0][0] == 'get_problem_rich'
-        assert calls[1][0] == 'get_public_testcases'
+        assert order == ["get_problem_rich", "get_public_testcases"]
         
-    def test_error_handling_in_integration_flow(self, mock_jutge_client, solution_generator):
+    def test_error_handling_in_integration_flow(self, solution_generator):
         """Test error handling throughout the integration flow"""
-        # Simulate API error
-        mock_jutge_client.problems.get_problem_rich.side_effect = Exception("Network Error")
-        problem_analyzer = ProblemAnalyzer(mock_jutge_client)
+        # Simulate API error (on a client of its own, since the shared one must keep working)
+        client = make_jutge_client()
+        client.problems.get_problem_rich.side_effect = Exception("Network Error")
+        problem_analyzer = ProblemAnalyzer(client)
         
         # Analysis should handle error gracefully
         problem_info = problem_analyzer.analyze_problem("P12345_en")
@@ -4,16 +4,42 @@ Simple test to verify the Jutge Problem Solver system
 """
 
 import os
+
+import pytest
+
 from jutge_solver import JutgeProblemSolver, Config
 
-def test_problem_reading():
-    """Test reading and analyzing a problem"""
-    print("🧪 Testing problem reading...")
-    
+def load_config():
+    """Load the configuration from the environment and the .env file"""
     config = Config.load_from_env()
     config.load_env_file()
+    return config
+
+def load_solver(config):
+    """Create the solver shared by all checks, or None if it cannot be built (e.g. missing API key)"""
+    try:
+        return JutgeProblemSolver(config)
+    except Exception as e:
+        print(f"❌ Solver setup failed: {e}")
+        return None
+
+@pytest.fixture(scope="module")
+def config():
+    """Configuration shared by the tests in this module"""
+    return load_config()
+
+@pytest.fixture(scope="module")
+def solver(config):
+    """Solver shared by the tests in this module (None when setup failed)"""
+    return load_solver(config)
+
+def test_problem_reading(solver):
+    """Test reading and analyzing a problem"""
+    print("🧪 Testing problem reading...")
     
-    solver = JutgeProblemSolver(config)
+    if solver is None:
+        print("❌ Problem reading skipped: solver setup failed")
+        return False
     
     # Test without authentication first (public problem)
     try:
@@ -30,18 +56,17 @@ def test_problem_reading():
         print(f"❌ Problem reading failed with exception: {e}")
         return False
 
-def test_authentication():
+def test_authentication(config, solver):
     """Test Jutge authentication"""
     print("🧪 Testing Jutge authentication...")
     
-    config = Config.load_from_env()
-    config.load_env_file()
-    
     if not config.jutge.email or not config.jutge.password:
         print("❌ Jutge credentials not found in environment")
         return False
     
-    solver = JutgeProblemSolver(config)
+    if solver is None:
+        print("❌ Jutge authentication skipped: solver setup failed")
+        return False
     
     try:
         if solver.authenticate():
@@ -54,38 +79,39 @@ def test_authentication():
         print(f"❌ Jutge authentication failed with exception: {e}")
         return False
 
-def test_openai_setup():
+def test_openai_setup(config, solver):
     """Test OpenAI API setup (without actual call)"""
     print("🧪 Testing OpenAI setup...")
     
-    config = Config.load_from_env()
-    config.load_env_file()
-    
     if not config.openai.api_key:
         print("❌ OpenRouter API key not found in environment")
         print("   Please add OPENROUTER_API_KEY to your .env file")
         return False
     
-    try:
-        solver = JutgeProblemSolver(config)
-        print("✅ OpenAI client initialized successfully!")
-        print(f"   Model: {config.openai.model}")
-        return True
-    except Exception as e:
-        print(f"❌ OpenAI setup failed: {e}")
+    # The client is created with the shared solver
+    if solver is None:
+        print("❌ OpenAI setup failed: solver could not be created")
         return False
+    
+    print("✅ OpenAI client initialized successfully!")
+    print(f"   Model: {config.openai.model}")
+    return True
 
 def main():
     """Run all tests"""
     print("🚀 Testing Jutge Problem Solver System")
     print("=" * 50)
     
+    config = load_config()
+    solver = load_solver(config)
+    
     tests = [
-        test_problem_reading,
-        test_authentication,
-        test_openai_setup
+        lambda: test_problem_reading(solver),
+        lambda: test_authentication(config, solver),
+        lambda: test_openai_setup(config, solver)
     ]
     
+    # Run in order on the shared solver: problem reading must happen before authenticating
     results = []
     for test in tests:
         result = test()
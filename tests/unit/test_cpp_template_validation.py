@@ -3,28 +3,13 @@
 Test script to validate C++ template enforcement in the benchmark system
 """
 
-import sys
-import os
+import pytest
 
-# Add the parent directory to the path so we can import the modules
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Includes and namespace that open every template below that has both
+TEMPLATE_HEADER = "#include <iostream>\nusing namespace std;\n\n"
 
-from jutge_solver.solution_generator import SolutionGenerator
-
-def test_cpp_template_validation():
-    """Test the C++ template validation functionality"""
-    
-    # Create a dummy solution generator (we only need the validation method)
-    generator = SolutionGenerator(None, None)
-    
-    print("Testing C++ Template Validation...")
-    print("=" * 50)
-    
-    # Test 1: Valid template
-    valid_template = """#include <iostream>
-using namespace std;
-
-int main() {
+# Valid template
+VALID_TEMPLATE = TEMPLATE_HEADER + """int main() {
     // Read input
     int a, b;
     cin >> a >> b;
@@ -37,15 +22,9 @@ int main() {
     
     return 0;
 }"""
-    
-    print("\nTest 1: Valid template")
-    print("-" * 30)
-    result1 = generator._validate_cpp_template(valid_template)
-    print(f"Result: {result1}")
-    assert result1 == True, "Valid template should pass validation"
-    
-    # Test 2: Missing include
-    missing_include = """using namespace std;
+
+# Missing #include <iostream>
+MISSING_INCLUDE = """using namespace std;
 
 int main() {
     int a, b;
@@ -54,15 +33,9 @@ int main() {
     cout << sum << endl;
     return 0;
 }"""
-    
-    print("\nTest 2: Missing #include <iostream>")
-    print("-" * 30)
-    result2 = generator._validate_cpp_template(missing_include)
-    print(f"Result: {result2}")
-    assert result2 == False, "Missing include should fail validation"
-    
-    # Test 3: Missing using namespace
-    missing_namespace = """#include <iostream>
+
+# Missing using namespace std
+MISSING_NAMESPACE = """#include <iostream>
 
 int main() {
     int a, b;
@@ -71,62 +44,29 @@ int main() {
     std::cout << sum << std::endl;
     return 0;
 }"""
-    
-    print("\nTest 3: Missing using namespace std")
-    print("-" * 30)
-    result3 = generator._validate_cpp_template(missing_namespace)
-    print(f"Result: {result3}")
-    assert result3 == False, "Missing using namespace should fail validation"
-    
-    # Test 4: Missing main function
-    missing_main = """#include <iostream>
-using namespace std;
 
-void solve() {
+# Missing main function
+MISSING_MAIN = TEMPLATE_HEADER + """void solve() {
     int a, b;
     cin >> a >> b;
     cout << a + b << endl;
 }"""
-    
-    print("\nTest 4: Missing main function")
-    print("-" * 30)
-    result4 = generator._validate_cpp_template(missing_main)
-    print(f"Result: {result4}")
-    assert result4 == False, "Missing main function should fail validation"
-    
-    # Test 5: Missing return 0
-    missing_return = """#include <iostream>
-using namespace std;
 
-int main() {
+# Missing return 0
+MISSING_RETURN = TEMPLATE_HEADER + """int main() {
     int a, b;
     cin >> a >> b;
     cout << a + b << endl;
 }"""
-    
-    print("\nTest 5: Missing return 0")
-    print("-" * 30)
-    result5 = generator._validate_cpp_template(missing_return)
-    print(f"Result: {result5}")
-    assert result5 == False, "Missing return 0 should fail validation"
-    
-    # Test 6: Missing input/output
-    missing_io = """#include <iostream>
-using namespace std;
 
-int main() {
+# Missing input/output operations
+MISSING_IO = TEMPLATE_HEADER + """int main() {
     int result = 42;
     return 0;
 }"""
-    
-    print("\nTest 6: Missing input/output operations")
-    print("-" * 30)
-    result6 = generator._validate_cpp_template(missing_io)
-    print(f"Result: {result6}")
-    assert result6 == False, "Missing I/O should fail validation"
-    
-    # Test 7: Valid template with extra headers
-    valid_with_extras = """#include <iostream>
+
+# Valid template with extra headers
+VALID_WITH_EXTRAS = """#include <iostream>
 #include <string>
 #include <vector>
 using namespace std;
@@ -144,51 +84,12 @@ int main() {
     cout << endl;
     return 0;
 }"""
-    
-    print("\nTest 7: Valid template with extra headers")
-    print("-" * 30)
-    result7 = generator._validate_cpp_template(valid_with_extras)
-    print(f"Result: {result7}")
-    assert result7 == True, "Valid template with extras should pass validation"
-    
-    print("\n" + "=" * 50)
-    print("All tests passed! C++ template validation is working correctly.")
 
-def test_example_templates():
-    """Test that the example templates from the prompts are valid"""
-    
-    generator = SolutionGenerator(None, None)
-    
-    print("\nTesting Example Templates from Prompts...")
-    print("=" * 50)
-    
-    # Example 1 from prompt
-    example1 = """#include <iostream>
-using namespace std;
-
-int main() {
-    // Read input
-    int a, b;
-    cin >> a >> b;
-    
-    // Process/Algorithm
-    int sum = a + b;
-    
-    // Print output
-    cout << sum << endl;
-    
-    return 0;
-}"""
-    
-    print("\nExample 1: Sum of two integers")
-    result1 = generator._validate_cpp_template(example1)
-    assert result1 == True, "Example 1 should be valid"
-    
-    # Example 2 from prompt
-    example2 = """#include <iostream>
-using namespace std;
+# Example templates from the prompts: sum of two integers (the valid template above)
+EXAMPLE_SUM = VALID_TEMPLATE
 
-int main() {
+# String processing
+EXAMPLE_STRING = TEMPLATE_HEADER + """int main() {
     // Read input
     string text;
     cin >> text;
@@ -204,16 +105,9 @@ int main() {
     
     return 0;
 }"""
-    
-    print("Example 2: String processing")
-    result2 = generator._validate_cpp_template(example2)
-    assert result2 == True, "Example 2 should be valid"
-    
-    # Example 3 from prompt
-    example3 = """#include <iostream>
-using namespace std;
 
-int main() {
+# Multiple test cases
+EXAMPLE_MULTIPLE_CASES = TEMPLATE_HEADER + """int main() {
     // Read input
     int n;
     cin >> n;
@@ -227,19 +121,22 @@ int main() {
     
     return 0;
 }"""
-    
-    print("Example 3: Multiple test cases")
-    result3 = generator._validate_cpp_template(example3)
-    assert result3 == True, "Example 3 should be valid"
-    
-    print("\nAll example templates are valid!")
-
-if __name__ == "__main__":
-    try:
-        test_cpp_template_validation()
-        test_example_templates()
-        print("\n🎉 All tests completed successfully!")
-        print("The C++ template enforcement system is ready for benchmarking.")
-    except Exception as e:
-        print(f"\n❌ Test failed: {e}")
-        sys.exit(1)
\ No newline at end of file
+
+# (case name, source, whether it follows the template)
+TEMPLATE_CASES = [
+    ("valid", VALID_TEMPLATE, True),
+    ("missing_include", MISSING_INCLUDE, False),
+    ("missing_namespace", MISSING_NAMESPACE, False),
+    ("missing_main", MISSING_MAIN, False),
+    ("missing_return", MISSING_RETURN, False),
+    ("missing_io", MISSING_IO, False),
+    ("valid_with_extras", VALID_WITH_EXTRAS, True),
+    ("example_sum", EXAMPLE_SUM, True),
+    ("example_string", EXAMPLE_STRING, True),
+    ("example_multiple_cases", EXAMPLE_MULTIPLE_CASES, True),
+]
+
+@pytest.mark.parametrize("name,source,expected", TEMPLATE_CASES, ids=[case[0] for case in TEMPLATE_CASES])
+def test_cpp_template_validation(solution_generator, name, source, expected):
+    """Test the C++ template validation functionality"""
+    assert solution_generator._validate_cpp_template(source) == expected, f"{name} should {'pass' if expected else 'fail'} validation"
@@ -4,132 +4,128 @@ Unit tests for problem_analyzer.py enhanced functionality
 
 import pytest
 import base64
+from types import SimpleNamespace
 from unittest.mock import Mock, MagicMock
 from datetime import datetime
-import sys
-import os
-
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
 
 from jutge_solver.problem_analyzer import ProblemAnalyzer
 
 
-class TestProblemAnalyzer:
-    """Test suite for enhanced problem analyzer functionality"""
+def make_testcase(name: str, input_data: bytes, correct: bytes) -> dict:
+    """Build a testcase dict with base64-encoded input and output, as the API returns them"""
+    return {
+        "name": name,
+        "input_b64": base64.b64encode(input_data).decode("ascii"),
+        "correct_b64": base64.b64encode(correct).decode("ascii")
+    }
+
+
+# Testcases served by the mock client, encoded once for all tests
+SAMPLE_TESTCASES = [
+    make_testcase("sample1", b"1 2\n", b"3\n"),
+    make_testcase("sample2", b"5 7\n", b"12\n")
+]
+
+# Public testcases (samples + one more)
+PUBLIC_TESTCASES = SAMPLE_TESTCASES + [
+    make_testcase("public1", b"10 20\n", b"30\n")
+]
+
+
+def make_jutge_client() -> Mock:
+    """Create a mock Jutge API client"""
+    client = Mock()
     
-    @pytest.fixture
-    def mock_jutge_client(self):
-        """Create a mock Jutge API client"""
-        client = Mock()
-        
-        # Mock problem rich data
-        mock_abstract_problem = Mock()
-        mock_abstract_problem.author = "Test Author"
-        mock_abstract_problem.problem_nm = "TEST001"
-        
-        mock_problem_rich = Mock()
-        mock_problem_rich.title = "Test Problem"
-        mock_problem_rich.html_statement = "<p>This is a test problem statement</p>"
-        mock_problem_rich.abstract_problem = mock_abstract_problem
-        mock_problem_rich.sample_testcases = [
-            {
-                "name": "sample1",
-                "input_b64": base64.b64encode("1 2\n".encode()).decode(),
-                "correct_b64": base64.b64encode("3\n".encode()).decode()
-            },
-            {
-                "name": "sample2", 
-                "input_b64": base64.b64encode("5 7\n".encode()).decode(),
-                "correct_b64": base64.b64encode("12\n".encode()).decode()
-            }
-        ]
-        
-        # Mock public testcases
-        mock_public_testcases = [
-            {
-                "name": "sample1",
-                "input_b64": base64.b64encode("1 2\n".encode()).decode(),
-                "correct_b64": base64.b64encode("3\n".encode()).decode()
-            },
-            {
-                "name": "sample2",
-                "input_b64": base64.b64encode("5 7\n".encode()).decode(), 
-                "correct_b64": base64.b64encode("12\n".encode()).decode()
-            },
-            {
-                "name": "public1",
-                "input_b64": base64.b64encode("10 20\n".encode()).decode(),
-                "correct_b64": base64.b64encode("30\n".encode()).decode()
-            }
-        ]
-        
-        client.problems.get_problem_rich.return_value = mock_problem_rich
-        client.problems.get_public_testcases.return_value = mock_public_testcases
-        
-        return client
+    # Problem rich data (plain data: only the client needs call tracking)
+    mock_abstract_problem = SimpleNamespace(author="Test Author", problem_nm="TEST001")
     
-    @pytest.fixture
-    def analyzer(self, mock_jutge_client):
-        """Create a ProblemAnalyzer instance with mocked client"""
-        return ProblemAnalyzer(mock_jutge_client)
+    mock_problem_rich = SimpleNamespace(
+        title="Test Problem",
+        html_statement="<p>This is a test problem statement</p>",
+        abstract_problem=mock_abstract_problem,
+        sample_testcases=SAMPLE_TESTCASES
+    )
     
-    def test_analyze_problem_with_rich_data(self, analyzer):
+    client.problems.get_problem_rich.return_value = mock_problem_rich
+    client.problems.get_public_testcases.return_value = PUBLIC_TESTCASES
+    
+    return client
+
+
+@pytest.fixture(scope="module")
+def mock_jutge_client():
+    """Mock client shared by the tests of the module (tests that need their own build one)"""
+    return make_jutge_client()
+
+
+@pytest.fixture(scope="module")
+def analyzer(mock_jutge_client):
+    """Create a ProblemAnalyzer instance with mocked client"""
+    return ProblemAnalyzer(mock_jutge_client)
+
+
+@pytest.fixture(scope="module")
+def analysis_result(analyzer):
+    """Analysis of the mocked problem, shared by the tests that only read it"""
+    return analyzer.analyze_problem("P12345_en")
+
+
+class TestProblemAnalyzer:
+    """Test suite for enhanced problem analyzer functionality"""
+    
+    def test_analyze_problem_with_rich_data(self, analysis_result):
         """Test that analyze_problem returns comprehensive problem information"""
-        result = analyzer.analyze_problem("P12345_en")
-        
-        assert result["success"] is True
-        assert result["problem_id"] == "P12345_en"
-        assert result["title"] == "Test Problem"
-        assert result["author"] == "Test Author"
-        assert result["statement"] == "<p>This is a test problem statement</p>"
-        assert "timestamp" in result
-        
-    def test_analyze_problem_includes_abstract_problem(self, analyzer):
+        assert analysis_result["success"] is True
+        assert analysis_result["problem_id"] == "P12345_en"
+        assert analysis_result["title"] == "Test Problem"
+        assert analysis_result["author"] == "Test Author"
+        assert analysis_result["statement"] == "<p>This is a test problem statement</p>"
+        assert "timestamp" in analysis_result
+        
+    def test_analyze_problem_includes_abstract_problem(self, analysis_result):
         """Test that abstract problem details are included in result"""
-        result = analyzer.analyze_problem("P12345_en")
-        
-        assert "abstract_problem" in result
-        assert result["abstract_problem"].author == "Test Author"
-        assert result["abstract_problem"].problem_nm == "TEST001"
+        assert "abstract_problem" in analysis_result
+        assert analysis_result["abstract_problem"].author == "Test Author"
+        assert analysis_result["abstract_problem"].problem_nm == "TEST001"
         
-    def test_analyze_problem_includes_sample_testcases(self, analyzer):
+    def test_analyze_problem_includes_sample_testcases(self, analysis_result):
         """Test that sample testcases are included in result"""
-        result = analyzer.analyze_problem("P12345_en")
-        
-        assert "sample_testcases" in result
-        assert len(result["sample_testcases"]) == 2
+        assert "sample_testcases" in analysis_result
+        assert len(analysis_result["sample_testcases"]) == 2
         
         # Check first sample testcase
-        testcase1 = result["sample_testcases"][0]
+        testcase1 = analysis_result["sample_testcases"][0]
         assert testcase1["name"] == "sample1"
-        assert base64.b64decode(testcase1["input_b64"]).decode() == "1 2\n"
-        assert base64.b64decode(testcase1["correct_b64"]).decode() == "3\n"
+        # The encoded fields are kept as served (their plaintext is checked in test_analyze_problem_decodes_testcases_once)
+        assert testcase1["input_b64"] == SAMPLE_TESTCASES[0]["input_b64"]
+        assert testcase1["correct_b64"] == SAMPLE_TESTCASES[0]["correct_b64"]
         
-    def test_analyze_problem_includes_public_testcases(self, analyzer):
+    def test_analyze_problem_includes_public_testcases(self, analysis_result):
         """Test that public testcases are included in result"""
-        result = analyzer.analyze_problem("P12345_en")
-        
-        assert "public_testcases" in result
-        assert len(result["public_testcases"]) == 3
+        assert "public_testcases" in analysis_result
+        assert len(analysis_result["public_testcases"]) == 3
         
         # Check that we have the additional public testcase
-        public_testcase = result["public_testcases"][2]
+        public_testcase = analysis_result["public_testcases"][2]
         assert public_testcase["name"] == "public1"
-        assert base64.b64decode(public_testcase["input_b64"]).decode() == "10 20\n"
-        assert base64.b64decode(public_testcase["correct_b64"]).decode() == "30\n"
+        assert public_testcase["input_b64"] == PUBLIC_TESTCASES[2]["input_b64"]
+        assert public_testcase["correct_b64"] == PUBLIC_TESTCASES[2]["correct_b64"]
+        assert public_testcase["input"] == "10 20\n"
         
     def test_analyze_problem_calls_correct_api_methods(self, analyzer, mock_jutge_client):
         """Test that the correct API methods are called"""
+        mock_jutge_client.reset_mock()  # Forget the calls of earlier tests sharing the client
         analyzer.analyze_problem("P12345_en")
         
         mock_jutge_client.problems.get_problem_rich.assert_called_once_with("P12345_en")
         mock_jutge_client.problems.get_public_testcases.assert_called_once_with("P12345_en")
         
-    def test_analyze_problem_handles_api_error(self, mock_jutge_client):
+    def test_analyze_problem_handles_api_error(self):
         """Test that API errors are handled gracefully"""
-        mock_jutge_client.problems.get_problem_rich.side_effect = Exception("API Error")
-        analyzer = ProblemAnalyzer(mock_jutge_client)
+        # A client of its own, since the shared one must keep working
+        client = make_jutge_client()
+        client.problems.get_problem_rich.side_effect = Exception("API Error")
+        analyzer = ProblemAnalyzer(client)
         
         result = analyzer.analyze_problem("P12345_en")
         
@@ -137,10 +133,37 @@ class TestProblemAnalyzer:
         assert "error" in result
         assert result["problem_id"] == "P12345_en"
         
-    def test_analyze_problem_preserves_full_problem_object(self, analyzer):
+    def test_analyze_problem_preserves_full_problem_object(self, analysis_result):
         """Test that the full problem rich object is preserved in result"""
-        result = analyzer.analyze_problem("P12345_en")
-        
-        assert "problem" in result
-        assert result["problem"].title == "Test Problem"
-        assert result["problem"].html_statement == "<p>This is a test problem statement</p>"
\ No newline at end of file
+        assert "problem" in analysis_result
+        assert analysis_result["problem"].title == "Test Problem"
+        assert analysis_result["problem"].html_statement == "<p>This is a test problem statement</p>"
+        
+    def test_analyze_problem_decodes_testcases_once(self, analysis_result):
+        """Test that testcases are decoded at analysis time"""
+        testcase1 = analysis_result["sample_testcases"][0]
+        assert testcase1["input"] == "1 2\n"
+        assert testcase1["output"] == "3\n"
+        assert analysis_result["public_testcases"][2]["output"] == "30\n"
+        
+    def test_decode_testcases_handles_objects_and_bad_base64(self, analyzer):
+        """Test that API objects become dicts and undecodable testcases keep only raw fields"""
+        api_testcase = Mock()
+        api_testcase.name = "sample1"
+        api_testcase.input_b64 = base64.b64encode("4\n".encode()).decode()
+        api_testcase.correct_b64 = base64.b64encode("16\n".encode()).decode()
+        
+        decoded = analyzer._decode_testcases([
+            api_testcase,
+            {"name": "broken", "input_b64": "not-base64!", "correct_b64": "???"}
+        ])
+        
+        assert decoded[0] == {
+            "name": "sample1",
+            "input_b64": api_testcase.input_b64,
+            "correct_b64": api_testcase.correct_b64,
+            "input": "4\n",
+            "output": "16\n"
+        }
+        assert "input" not in decoded[1]
+        assert decoded[1]["input_b64"] == "not-base64!"
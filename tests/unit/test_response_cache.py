@@ -0,0 +1,98 @@
+"""
+Unit tests for response_cache.py and its use by the solution generator
+"""
+
+import pytest
+import sys
+import os
+from unittest.mock import Mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+
+from jutge_solver.response_cache import ResponseCache
+from jutge_solver.solution_generator import SolutionGenerator
+
+
+class TestResponseCache:
+    """Test suite for the SQLite response cache"""
+    
+    def test_put_and_get(self, tmp_path):
+        """Test that stored results are returned for the same key only"""
+        cache = ResponseCache(str(tmp_path / "cache.db"))
+        cache.put("key", {"success": True, "code": "print(1)"}, "P1_en", "Python3", "gpt-4o")
+        
+        assert cache.get("key") == {"success": True, "code": "print(1)"}
+        assert cache.get("other") is None
+    
+    def test_entries_persist_across_instances(self, tmp_path):
+        """Test that the cache survives reopening the database"""
+        path = str(tmp_path / "nested" / "cache.db")
+        ResponseCache(path).put("key", {"code": "x"})
+        
+        assert ResponseCache(path).get("key") == {"code": "x"}
+    
+    def test_expired_entries_are_ignored(self, tmp_path):
+        """Test that entries older than the TTL are treated as misses"""
+        cache = ResponseCache(str(tmp_path / "cache.db"), ttl=-1)
+        cache.put("key", {"code": "x"})
+        
+        assert cache.get("key") is None
+
+
+class TestGeneratorResponseCache:
+    """Test suite for answering repeated generations from the response cache"""
+    
+    @pytest.fixture
+    def config(self, tmp_path, mock_openai_config):
+        """Create a config with the response cache enabled"""
+        return mock_openai_config(verbose=False, response_cache_path=str(tmp_path / "cache.db"),
+                                  response_cache_ttl=None)
+    
+    @pytest.fixture
+    def client(self, make_completion):
+        """Create a mock OpenAI client that answers every call with the same solution"""
+        client = Mock()
+        client.chat.completions.create.side_effect = lambda **kwargs: make_completion(
+            "a, b = map(int, input().split())\nprint(a * b)"
+        )
+        return client
+    
+    def test_repeated_problem_is_not_regenerated(self, config, client):
+        """Test that a second generation of the same problem and attempt makes no API call"""
+        problem_info = {"problem_id": "P1_en", "title": "Product"}
+        
+        first = SolutionGenerator(client, config).generate_solution(problem_info, "Python3")
+        second = SolutionGenerator(client, config).generate_solution(problem_info, "Python3")
+        
+        assert client.chat.completions.create.call_count == 2
+        assert second["cached"] is True
+        assert second["code"] == first["code"]
+        assert second["token_usage"]["total_tokens"] == 0
+    
+    def test_retries_are_cached_separately(self, config, client):
+        """Test that another attempt number still calls the API"""
+        problem_info = {"problem_id": "P1_en", "title": "Product"}
+        generator = SolutionGenerator(client, config)
+        
+        generator.generate_solution(problem_info, "Python3", attempt=1)
+        result = generator.generate_solution(problem_info, "Python3", attempt=2)
+        
+        assert client.chat.completions.create.call_count == 4
+        assert "cached" not in result
+    
+    def test_identical_statements_share_a_solution(self, config, client):
+        """Test that a problem with the same statement under another ID reuses the cached solution"""
+        generator = SolutionGenerator(client, config)
+        
+        generator.generate_solution({"problem_id": "P1_en", "title": "Product"}, "Python3")
+        duplicate = generator.generate_solution({"problem_id": "P2_en", "title": "Product"}, "Python3")
+        variant = generator.generate_solution({"problem_id": "P3_en", "title": "Sum"}, "Python3")
+        
+        assert duplicate["cached"] is True
+        assert "cached" not in variant
+        assert client.chat.completions.create.call_count == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
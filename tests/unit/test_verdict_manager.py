@@ -0,0 +1,183 @@
+"""
+Unit tests for verdict_manager.py polling of several submissions at once
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from jutge_solver import verdict_manager
+from jutge_solver.verdict_manager import VerdictManager
+from jutge_solver.verdict_timing import VerdictTimingStats
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the monotonic clock and sleep with a fake clock that only moves when sleeping, and use the maximum jitter"""
+    clock = SimpleNamespace(now=0.0, sleeps=[])
+    
+    def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+    
+    monkeypatch.setattr(verdict_manager.time, "monotonic", lambda: clock.now)
+    monkeypatch.setattr(verdict_manager.time, "sleep", sleep)
+    monkeypatch.setattr(verdict_manager.random, "uniform", lambda low, high: high)
+    return clock
+
+
+def _make_manager(states, timeout=60):
+    """Build a manager whose client returns the listed states of each submission in turn"""
+    client = Mock()
+    client.student.submissions.get.side_effect = lambda problem_id, submission_id: states[submission_id].pop(0)
+    return VerdictManager(client, SimpleNamespace(submission_timeout=timeout))
+
+
+class TestGetVerdicts:
+    """Test suite for VerdictManager.get_verdicts"""
+    
+    def test_each_submission_backs_off_on_its_own(self, clock):
+        """Test that pending submissions are repolled with a growing delay while judged ones stop"""
+        pending = SimpleNamespace(state="pending")
+        states = {
+            "S1": [SimpleNamespace(state="done", veredict="AC")],
+            "S2": [pending, pending, SimpleNamespace(state="done", veredict="WA")],
+        }
+        manager = _make_manager(states)
+        
+        results = manager.get_verdicts({"S1": "P1_en", "S2": "P2_en"})
+        
+        assert results["S1"]["verdict"] == "AC"
+        assert results["S1"]["polls"] == 1
+        assert results["S2"]["verdict"] == "WA"
+        assert results["S2"]["polls"] == 3
+        assert clock.sleeps == pytest.approx([0.55, 0.825])
+    
+    def test_timeout_per_submission(self, clock):
+        """Test that a submission still pending after the timeout gets a timeout result"""
+        states = {"S1": [SimpleNamespace(state="pending")] * 10}
+        manager = _make_manager(states, timeout=3)
+        
+        results = manager.get_verdicts({"S1": "P1_en"})
+        
+        assert results["S1"]["timeout"] is True
+        assert results["S1"]["polls"] == 5
+
+
+class TestGetVerdict:
+    """Test suite for VerdictManager.get_verdict polling"""
+    
+    def test_backoff_grows_after_each_pending_poll(self, clock):
+        """Test that the delay grows by the backoff factor after every pending poll"""
+        pending = SimpleNamespace(state="pending")
+        manager = _make_manager({"S1": [pending] * 3 + [SimpleNamespace(state="done", veredict="AC")]})
+        
+        result = manager.get_verdict("P1_en", "S1")
+        
+        assert result["verdict"] == "AC"
+        assert clock.sleeps == pytest.approx([0.55, 0.825, 1.2375])
+    
+    def test_last_sleep_stops_at_the_timeout(self, clock):
+        """Test that polling does not sleep past the timeout"""
+        manager = _make_manager({"S1": [SimpleNamespace(state="pending")] * 10}, timeout=1)
+        
+        result = manager.get_verdict("P1_en", "S1")
+        
+        assert result["timeout"] is True
+        assert result["polls"] == 3
+        assert clock.sleeps == pytest.approx([0.55, 0.45])
+    
+    def test_error_retry_stops_at_the_deadline(self, clock):
+        """Test that the wait after a polling error does not run past the timeout"""
+        client = Mock()
+        client.student.submissions.get.side_effect = ConnectionError("reset")
+        manager = VerdictManager(client, SimpleNamespace(submission_timeout=2.5))
+        
+        result = manager.get_verdict("P1_en", "S1")
+        
+        assert result["timeout"] is True
+        assert clock.sleeps == pytest.approx([1, 1, 0.5])
+
+
+class TestVerdictTimingStats:
+    """Test suite for polling from a history of verdict times"""
+    
+    def test_schedule_from_quantiles_with_compiler_fallback(self, tmp_path):
+        """Test that polls follow the problem's history, or the compiler's when the problem has too little"""
+        path = str(tmp_path / "times.json")
+        stats = VerdictTimingStats(path)
+        for elapsed in range(1, 11):
+            stats.record("P1_en", "G++17", elapsed)
+        
+        reloaded = VerdictTimingStats(path)
+        
+        assert reloaded.poll_schedule("P1_en", "G++17") == [2, 3, 4, 5, 7, 8, 9, 10]
+        assert reloaded.poll_schedule("P2_en", "G++17") == [2, 3, 4, 5, 7, 8, 9, 10]
+        assert reloaded.poll_schedule("P1_en", "Python3") == []
+    
+    def test_get_verdict_polls_at_scheduled_times(self, clock, tmp_path):
+        """Test that get_verdict sleeps until the scheduled poll times and records the verdict time"""
+        path = str(tmp_path / "times.json")
+        stats = VerdictTimingStats(path)
+        for elapsed in (1, 1, 1, 4, 4):
+            stats.record("P1_en", "G++17", elapsed)
+        pending = SimpleNamespace(state="pending")
+        manager = _make_manager({"S1": [pending, pending, SimpleNamespace(state="done", veredict="AC")]})
+        manager.timing_stats = VerdictTimingStats(path)
+        
+        result = manager.get_verdict("P1_en", "S1", "G++17")
+        
+        assert result["verdict"] == "AC"
+        assert clock.sleeps == pytest.approx([1, 3])
+        assert manager.timing_stats.poll_schedule("P1_en", "G++17") == [1, 2.5, 4]
+
+
+class TestAlternativeVerdictCheck:
+    """Test suite for the fallback verdict check through the list of all submissions"""
+    
+    def test_submission_list_is_fetched_once_per_ttl(self, clock):
+        """Test that repeated fallback checks look submissions up in one cached index"""
+        client = Mock()
+        client.student.submissions.get_all.return_value = [
+            SimpleNamespace(submission_id="S1", veredict="AC"),
+            SimpleNamespace(submission_id="S2", veredict="WA"),
+        ]
+        manager = VerdictManager(client, SimpleNamespace(submission_timeout=60))
+        
+        first = manager._try_alternative_verdict_check("P1_en", "S1", 0, 1)
+        second = manager._try_alternative_verdict_check("P2_en", "S2", 0, 1)
+        clock.now += verdict_manager.SUBMISSIONS_INDEX_TTL + 1
+        manager._try_alternative_verdict_check("P1_en", "S1", 0, 1)
+        
+        assert (first["verdict"], second["verdict"]) == ("AC", "WA")
+        assert client.student.submissions.get_all.call_count == 2
+
+
+class TestInterpretVerdict:
+    """Test suite for VerdictManager.interpret_verdict"""
+    
+    def test_flags_and_suggestions(self):
+        """Test that verdicts get their flags and an independent copy of their suggestions"""
+        manager = VerdictManager(Mock(), SimpleNamespace(submission_timeout=60))
+        
+        wrong_answer = manager.interpret_verdict("WA")
+        wrong_answer["suggestions"].append("Extra")
+        
+        assert wrong_answer["is_logic_error"] is True
+        assert wrong_answer["should_retry"] is False
+        assert manager.interpret_verdict("WA")["suggestions"] == list(verdict_manager.VERDICT_SUGGESTIONS["WA"])
+        assert manager.interpret_verdict("RE")["should_retry"] is True
+        assert manager.interpret_verdict("AC")["success"] is True
+        assert manager.interpret_verdict("XX")["meaning"] == "Unknown"
+        assert manager.interpret_verdict("XX")["suggestions"] == []
+
+
+class TestSubmissionDetails:
+    """Test suite for copying submission details into verdict results"""
+    
+    def test_submission_details_only_present_attributes(self):
+        """Test that only the detail attributes the state has are copied, including falsy ones"""
+        manager = VerdictManager(Mock(), SimpleNamespace(submission_timeout=60))
+        state = SimpleNamespace(state="done", veredict="AC", score=0, compiler_output="")
+        
+        assert manager._extract_submission_details(state) == {"score": 0, "compiler_output": ""}
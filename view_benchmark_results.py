@@ -4,22 +4,43 @@ View benchmark results with enhanced debugging information
 """
 
 import json
+import os
 import sys
-from pathlib import Path
+from functools import lru_cache
+from typing import Optional
 from rich.console import Console
 from rich.table import Table
-from rich.syntax import Syntax
 from jutge_solver.config import Config
 
 console = Console()
 
+# Characters of an error shown in the summary table (the details section shows it whole)
+ERROR_PREVIEW_LENGTH = 50
+
+
+@lru_cache(maxsize=None)
+def _code_highlighting():
+    """Lexer and theme shared by all the generated code shown (passing names would look both up per block)"""
+    from pygments.lexers import get_lexer_by_name
+    from rich.syntax import Syntax
+    
+    return get_lexer_by_name("python", stripnl=False, ensurenl=True, tabsize=4), Syntax.get_theme("monokai")
+
+
+def _code_syntax(code: str):
+    """Syntax-highlighted generated code (rich.syntax and Pygments are only imported once code is shown)"""
+    from rich.syntax import Syntax
+    
+    lexer, theme = _code_highlighting()
+    return Syntax(code, lexer, theme=theme, line_numbers=True)
+
 
 def view_results(filename: str):
     """View benchmark results from a JSON file"""
     
     # Load configuration for accepted verdicts
     config = Config.load_from_env()
-    accepted_verdicts = config.solver.accepted_verdicts
+    accepted_verdicts = frozenset(config.solver.accepted_verdicts)
     
     with open(filename, 'r') as f:
         data = json.load(f)
@@ -27,13 +48,10 @@ def view_results(filename: str):
     console.print(f"\n[bold]Benchmark Results: {data['problem_set']}[/bold]")
     console.print(f"Results file: {filename}\n")
     
-    # Group results by model
+    # Group results by model, in order of first appearance (the lists only reference the loaded results)
     results_by_model = {}
     for result in data['results']:
-        model = result['model_name']
-        if model not in results_by_model:
-            results_by_model[model] = []
-        results_by_model[model].append(result)
+        results_by_model.setdefault(result['model_name'], []).append(result)
     
     # Display results for each model
     for model_name, results in results_by_model.items():
@@ -46,38 +64,45 @@ def view_results(filename: str):
         table.add_column("Submission ID")
         table.add_column("Error")
         
+        # Rows and the failed submissions come from the same pass over the results
+        failed = []
         for result in results:
-            verdict_style = "green" if result['verdict'] in accepted_verdicts else "red" if result['verdict'] else "yellow"
+            verdict, error = result['verdict'], result['error'] or ""
+            accepted = verdict in accepted_verdicts
+            verdict_style = "green" if accepted else "red" if verdict else "yellow"
             table.add_row(
                 result['problem_id'],
-                f"[{verdict_style}]{result['verdict'] or 'N/A'}[/{verdict_style}]",
+                f"[{verdict_style}]{verdict or 'N/A'}[/{verdict_style}]",
                 result['submission_id'] or "N/A",
-                result['error'][:50] + "..." if result['error'] and len(result['error']) > 50 else result['error'] or ""
+                error[:ERROR_PREVIEW_LENGTH] + "..." if len(error) > ERROR_PREVIEW_LENGTH else error
             )
+            if not accepted or error:
+                failed.append(result)
         
         console.print(table)
         
         # Show failed submissions with details
-        failed = [r for r in results if r['verdict'] not in accepted_verdicts or r['error']]
         if failed:
             console.print(f"\n[yellow]Failed/Error Details for {model_name}:[/yellow]")
             
             for result in failed:
                 console.print(f"\n[bold]Problem: {result['problem_id']}[/bold]")
                 console.print(f"Verdict: {result['verdict'] or 'No verdict'}")
-                if result['error']:
-                    console.print(f"[red]Error: {result['error']}[/red]")
+                error = result['error']
+                if error:
+                    console.print(f"[red]Error: {error}[/red]")
                 
                 # Show generated code if available
-                if 'solution_code' in result and result['solution_code']:
+                solution_code = result.get('solution_code')
+                if solution_code:
                     console.print("\n[bold]Generated Code:[/bold]")
-                    syntax = Syntax(result['solution_code'], "python", theme="monokai", line_numbers=True)
-                    console.print(syntax)
+                    console.print(_code_syntax(solution_code))
                 
                 # Show submission details if available
-                if 'submission_details' in result and result['submission_details']:
+                submission_details = result.get('submission_details')
+                if submission_details:
                     console.print("\n[bold]Submission Details:[/bold]")
-                    console.print(json.dumps(result['submission_details'], indent=2))
+                    console.print(json.dumps(submission_details, indent=2))
                 
                 console.print("-" * 60)
     
@@ -109,20 +134,33 @@ def view_results(filename: str):
             console.print(stats_table)
 
 
+def _latest_results_file(results_dir: str) -> Optional[str]:
+    """Path of the most recently modified benchmark results file in results_dir, or None if there is none"""
+    try:
+        with os.scandir(results_dir) as entries:
+            # One directory scan, keeping only the newest entry instead of collecting them all
+            latest = max(
+                (entry for entry in entries
+                 if entry.name.startswith("benchmark_results_") and entry.name.endswith(".json")),
+                key=lambda entry: entry.stat().st_mtime,
+                default=None
+            )
+    except FileNotFoundError:
+        return None
+    return latest.path if latest is not None else None
+
+
 def main():
     if len(sys.argv) < 2:
-        # Find the most recent results file
-        results_dir = Path("results")
-        json_files = list(results_dir.glob("benchmark_results_*.json"))
+        # Find the most recent results file (file names start with the problem set, so only mtimes order them)
+        latest_file = _latest_results_file("results")
         
-        if not json_files:
+        if latest_file is None:
             console.print("[red]No benchmark results found in results/ directory[/red]")
             sys.exit(1)
         
-        # Sort by modification time and get the most recent
-        latest_file = max(json_files, key=lambda p: p.stat().st_mtime)
         console.print(f"[yellow]No file specified, using most recent: {latest_file}[/yellow]")
-        view_results(str(latest_file))
+        view_results(latest_file)
     else:
         view_results(sys.argv[1])
 